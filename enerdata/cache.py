@@ -0,0 +1,156 @@
+# -*- coding: utf-8 -*-
+import errno
+import os
+import tempfile
+from collections import namedtuple, OrderedDict
+from contextlib import contextmanager
+from threading import Lock
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+
+CacheInfo = namedtuple('CacheInfo', ['hits', 'misses', 'maxsize', 'currsize'])
+
+
+class LRUCache(object):
+    """Thread safe mapping which keeps the last used `maxsize` items.
+
+    Lookups through `get` update the hits and misses counters.
+    """
+
+    def __init__(self, maxsize=128):
+        assert maxsize > 0, "maxsize must be a positive number"
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            try:
+                value = self._touch(key)
+            except KeyError:
+                self.misses += 1
+                return default
+            self.hits += 1
+            return value
+
+    def __getitem__(self, key):
+        with self._lock:
+            return self._touch(key)
+
+    def _touch(self, key):
+        # Move the key to the end, as the last used one
+        value = self._data[key]
+        try:
+            self._data.move_to_end(key)
+        except AttributeError:
+            del self._data[key]
+            self._data[key] = value
+        return value
+
+    def __setitem__(self, key, value):
+        with self._lock:
+            self._data.pop(key, None)
+            self._data[key] = value
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def __delitem__(self, key):
+        with self._lock:
+            del self._data[key]
+
+    def __contains__(self, key):
+        return key in self._data
+
+    def __len__(self):
+        return len(self._data)
+
+    def keys(self):
+        with self._lock:
+            return list(self._data.keys())
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def info(self):
+        return CacheInfo(self.hits, self.misses, self.maxsize, len(self._data))
+
+
+class DiskCache(object):
+    """Bytes stored by key as files of a directory.
+
+    The files are written to a temporary file and renamed, so readers never
+    see a partial file, and `lock` serializes the work on a key between
+    processes (only where fcntl is available).
+    """
+
+    def __init__(self, path, suffix='.cache'):
+        self.path = path
+        self.suffix = suffix
+        try:
+            os.makedirs(path)
+        except OSError as e:
+            if e.errno != errno.EEXIST:
+                raise
+
+    def _get_filename(self, key):
+        return os.path.join(self.path, '{0}{1}'.format(key, self.suffix))
+
+    def get(self, key, default=None):
+        try:
+            with open(self._get_filename(key), 'rb') as f:
+                return f.read()
+        except IOError as e:
+            if e.errno != errno.ENOENT:
+                raise
+            return default
+
+    def __setitem__(self, key, value):
+        fd, tmp_filename = tempfile.mkstemp(dir=self.path, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(value)
+                f.flush()
+                os.fsync(f.fileno())
+            getattr(os, 'replace', os.rename)(
+                tmp_filename, self._get_filename(key)
+            )
+        except Exception:
+            os.remove(tmp_filename)
+            raise
+
+    def __delitem__(self, key):
+        try:
+            os.remove(self._get_filename(key))
+        except OSError as e:
+            if e.errno != errno.ENOENT:
+                raise
+            raise KeyError(key)
+
+    def __contains__(self, key):
+        return os.path.exists(self._get_filename(key))
+
+    def keys(self):
+        return sorted(
+            filename[:-len(self.suffix)] for filename in os.listdir(self.path)
+            if filename.endswith(self.suffix)
+        )
+
+    @contextmanager
+    def lock(self, key):
+        """Exclusive lock of a key shared by all the processes."""
+        with open(self._get_filename(key) + '.lock', 'a') as f:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(f.fileno(), fcntl.LOCK_UN)
@@ -1,5 +1,6 @@
 # -*- coding: utf-8 -*-
 import copy
+from datetime import date
 
 ELECTRIC_ZONES = {
     '1': 'Peninsular',
@@ -11,6 +12,7 @@ ELECTRIC_ZONES = {
 
 # Tariffs from BOE-A-2020-1066 (https://www.boe.es/eli/es/cir/2020/01/15/3)
 TARIFFS_START_DATE_STR = '2021-06-01'
+TARIFFS_START_DATE = date(2021, 6, 1)
 
 # month/day
 DAYTYPE_BY_ELECTRIC_ZONE_CIR03_2020 = {
@@ -1,15 +1,43 @@
 # -*- coding: utf-8 -*-
 import calendar
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
+import numpy as np
 from .normalized_power import NormalizedPower
-from ..datetime.station import get_station
+from ..datetime.station import get_station, get_stations
+from ..datetime.epoch import walls_and_instants, hourly_range
 from ..datetime.holidays import get_holidays
 from ..datetime.timezone import TIMEZONE
 from ..datetime.work_and_holidays import get_num_of_workdays_holidays
 from .electrical_seasons import PERIODS_2x_BY_ELECTRIC_ZONE_CIR03_2020, \
     PERIODS_3x_BY_ELECTRIC_ZONE_CIR03_2020, PERIODS_6x_BY_ELECTRIC_ZONE, DAYTYPE_BY_ELECTRIC_ZONE, \
-    DAYTYPE_BY_ELECTRIC_ZONE_CIR03_2020, TARIFFS_START_DATE_STR, PERIODS_6x_BY_ELECTRIC_ZONE_CIR03_2020
-from ..profiles import my_round
+    DAYTYPE_BY_ELECTRIC_ZONE_CIR03_2020, TARIFFS_START_DATE, PERIODS_6x_BY_ELECTRIC_ZONE_CIR03_2020
+from ..profiles import my_round, round_array
+
+
+def apply_curve_losses(measures, losses, kva):
+    """Apply the losses of a low voltage measure to the consumption of every
+    hour of a curve.
+
+    :param measures: list of ProfileHour or ProfileMeasures, updated in place
+    :param losses: losses of the tariff
+    :param kva: kVA of the transformer
+    :return: the measures
+    """
+    transformer_losses = my_round(0.01 * kva, 2)
+    column = getattr(measures, 'measure', None)
+    if isinstance(column, np.ndarray):
+        measures.measure = (
+            round_array(column * (1 + losses), 2) + transformer_losses
+        )
+        return measures
+    consumptions = [measure.measure for measure in measures]
+    consumptions = (
+        round_array(np.asarray(consumptions, dtype=np.float64) * (1 + losses), 2)
+        + transformer_losses
+    )
+    for idx, consumption in enumerate(consumptions.tolist()):
+        measures[idx] = measures[idx]._replace(measure=consumption)
+    return measures
 
 
 def check_range_hours(hours):
@@ -39,12 +67,82 @@ def are_powers_ascending(powers):
 
 
 def set_day_type_electric_zone(current_date):
-    if current_date.strftime('%Y-%m-%d') >= TARIFFS_START_DATE_STR:
+    if isinstance(current_date, datetime):
+        current_date = current_date.date()
+    if current_date >= TARIFFS_START_DATE:
         day_type_by_zone = DAYTYPE_BY_ELECTRIC_ZONE_CIR03_2020
     else:
         day_type_by_zone = DAYTYPE_BY_ELECTRIC_ZONE
     return day_type_by_zone
 
+
+def get_holidays_mask(days, holidays=None):
+    """Vectorized check of weekends and holidays.
+
+    :param days: datetime64[D] array
+    :param holidays: list of holidays, by default the holidays of each year
+    :return: boolean array, True for weekends and holidays
+    """
+    # 1970-01-01 was thursday
+    weekday = (days.astype(np.int64) + 3) % 7
+    if not holidays:
+        holidays = set()
+        for year in np.unique(days.astype('datetime64[Y]')).astype(int) + 1970:
+            holidays |= set(get_holidays(int(year)))
+    holidays = np.array(
+        [h for h in holidays if not isinstance(h, datetime)],
+        dtype='datetime64[D]'
+    )
+    return (weekday >= 5) | np.isin(days, holidays)
+
+
+DAYTYPES = (None, 'A', 'A1', 'B', 'B1', 'C', 'D')
+
+_DAYTYPES_TABLES = {}
+
+
+def get_daytypes_table(zone, year):
+    """Daytypes of every day of a year, not taking care of weekends nor
+    holidays.
+
+    The table is compiled the first time a zone and year is requested.
+
+    :param zone in ['1', '2', '3' ,'4', '5']
+    :param year: year of the table
+    :returns: int8 array of 366 indexes to DAYTYPES, by day of the year
+    """
+    key = (zone, year)
+    table = _DAYTYPES_TABLES.get(key)
+    if table is None:
+        table = np.zeros(366, dtype=np.int8)
+        day = date(year, 1, 1)
+        while day.year == year:
+            day_type_by_zone = set_day_type_electric_zone(day)
+            monthday = day.strftime('%m/%d')
+            for daytype, periods in day_type_by_zone[zone].items():
+                if any(p[0] <= monthday <= p[1] for p in periods):
+                    table[day.timetuple().tm_yday - 1] = DAYTYPES.index(
+                        daytype
+                    )
+                    break
+            day += timedelta(days=1)
+        _DAYTYPES_TABLES[key] = table
+    return table
+
+
+def _get_daytypes(days, zone):
+    daytypes = np.zeros(len(days), dtype=np.int8)
+    years = days.astype('datetime64[Y]')
+    for year in np.unique(years):
+        mask = years == year
+        day_of_year = (days[mask] - year.astype('datetime64[D]')).astype(
+            np.int64
+        )
+        table = get_daytypes_table(zone, int(year.astype(np.int64)) + 1970)
+        daytypes[mask] = table[day_of_year]
+    return daytypes
+
+
 def get_daytype_by_date_and_zone(date_time, zone='1', holidays=None):
     """
     Calcultes daytype from date and zone.
@@ -63,13 +161,22 @@ def get_daytype_by_date_and_zone(date_time, zone='1', holidays=None):
     if is_weekend or date_time.date() in holidays:
         return 'D'
 
-    day_type_by_zone = set_day_type_electric_zone(date_time)
+    table = get_daytypes_table(zone, date_time.year)
+    day_of_year = date_time.toordinal() - date(date_time.year, 1, 1).toordinal()
+    return DAYTYPES[table[day_of_year]]
 
-    monthday = date_time.strftime('%m/%d')
-    for daytype, periods in day_type_by_zone[zone].items():
-        for period in periods:
-            if period[0] <= monthday <= period[1]:
-                return daytype
+
+def get_daytypes_by_dates_and_zone(days, zone='1', holidays=None):
+    """
+    Vectorized get_daytype_by_date_and_zone.
+    :param days: datetime64[D] array
+    :param zone in ['1', '2', '3' ,'4', '5']
+    :param holidays list of holidays, by default the holidays of each year
+    :returns numpy array of daytypes ('A', 'A1', 'B', 'B1', 'C', 'D')
+    """
+    daytypes = _get_daytypes(days, zone)
+    daytypes[get_holidays_mask(days, holidays)] = DAYTYPES.index('D')
+    return np.array(DAYTYPES, dtype=object)[daytypes]
 
 
 class Tariff(object):
@@ -78,6 +185,7 @@ class Tariff(object):
     def __init__(self, code=None, **kwargs):
         self.code = code
         self._periods = tuple()
+        self._periods_tables = {}
         self.cof = None
         self.require_powers_above_min_power = False
         self.require_summer_winter_hours = True
@@ -90,6 +198,7 @@ class Tariff(object):
     @periods.setter
     def periods(self, value):
         self._periods = value
+        self._periods_tables = {}
         validate = self.periods_validation
         hours = {
             'holidays': [],
@@ -141,40 +250,61 @@ class Tariff(object):
     def get_max_power(self):
         return self.max_power
 
-    def get_period_by_date(self, date_time, holidays=None, magn='te'):
-        station = get_station(date_time)
-        if not holidays:
-            holidays = get_holidays(date_time.year)
-        date = date_time.date()
-        if (calendar.weekday(date.year, date.month, date.day) in (5, 6)
-                or date in holidays):
-            holiday = True
-        else:
-            holiday = False
+    @property
+    def daytype_zones(self):
+        """Geographic zones used by the daytype periods of the tariff."""
+        return tuple(sorted(set(p.geom_zone for p in self.periods if p.daytype)))
+
+    @property
+    def has_station_periods(self):
+        return any(not p.daytype for p in self.periods)
+
+    def _get_periods_layout(self):
+        layout = self._periods_tables.get('layout')
+        if layout is None:
+            layout = (self.has_station_periods, self.daytype_zones)
+            self._periods_tables['layout'] = layout
+        return layout
+
+    def get_periods_table(self, holiday, station=None, daytypes=(), magn='te'):
+        """Get the period of every hour of a day.
+
+        The table is compiled the first time a kind of day is requested and
+        kept until the periods of the tariff change.
+
+        :param holiday: True for weekends and holidays
+        :param station: 'summer' or 'winter' (only used by non daytype periods)
+        :param daytypes: tuple of (zone, daytype) pairs for the daytype periods
+        :param magn: 'te' for energy periods or 'tp' for power periods
+        :return: tuple of 24 periods indexed by hour (None if no period)
+        """
+        key = (magn, holiday, station, daytypes)
+        table = self._periods_tables.get(key)
+        if table is None:
+            table = self._compile_periods_table(
+                holiday, station, dict(daytypes), magn
+            )
+            self._periods_tables[key] = table
+        return table
+
+    def _compile_periods_table(self, holiday, station, daytypes, magn):
+        table = [None] * 24
         periods = self.energy_periods
         if magn == 'tp':
             periods = self.power_periods
+        has_holidays_periods = self.has_holidays_periods
         for period in periods.values():
-            if period.holiday == holiday or not self.has_holidays_periods:
+            if period.holiday == holiday or not has_holidays_periods:
                 if period.daytype:
                     zone = period.geom_zone
-                    daytype = get_daytype_by_date_and_zone(
-                        date_time, zone, holidays
-                    )
-                    periods_ranges = period.periods_by_zone_and_day[zone][daytype]
+                    periods_ranges = period.periods_by_zone_and_day[zone][daytypes[zone]]
                     range_list = periods_ranges[int(period.code[-1]) - 1]
                 else:
                     range_list = getattr(period, '%s_hours' % station)
-                for range_h in range_list:
-                    if range_h[0] <= date_time.hour < range_h[1]:
-                        return period
             elif magn == 'tp':
                 if period.daytype:
                     zone = period.geom_zone
-                    daytype = get_daytype_by_date_and_zone(
-                        date_time, zone, holidays
-                    )
-                    periods_ranges = period.periods_by_zone_and_day[zone][daytype]
+                    periods_ranges = period.periods_by_zone_and_day[zone][daytypes[zone]]
                     range_list = periods_ranges[int(period.code[-1]) - 1]
                 else:
                     if holiday and self.has_holidays_hours_in_periods:
@@ -184,10 +314,99 @@ class Tariff(object):
                             continue
                     else:
                         range_list = getattr(period, '%s_hours' % station)
-                for range_h in range_list:
-                    if range_h[0] <= date_time.hour < range_h[1]:
-                        return period
-        return None
+            else:
+                continue
+            # The first period matching an hour wins
+            for range_h in range_list:
+                for hour in range(max(range_h[0], 0), min(range_h[1], 24)):
+                    if table[hour] is None:
+                        table[hour] = period
+        return tuple(table)
+
+    def get_period_by_date(self, date_time, holidays=None, magn='te'):
+        if not holidays:
+            holidays = get_holidays(date_time.year)
+        date = date_time.date()
+        if (calendar.weekday(date.year, date.month, date.day) in (5, 6)
+                or date in holidays):
+            holiday = True
+        else:
+            holiday = False
+        has_station_periods, daytype_zones = self._get_periods_layout()
+        station = None
+        if has_station_periods:
+            station = get_station(date_time)
+        daytypes = tuple(
+            (zone, get_daytype_by_date_and_zone(date_time, zone, holidays))
+            for zone in daytype_zones
+        )
+        table = self.get_periods_table(holiday, station, daytypes, magn)
+        return table[date_time.hour]
+
+    def classify(self, datetimes, holidays=None, magn='te'):
+        """Get the period code of each datetime as get_period_by_date does.
+
+        :param datetimes: iterable of datetimes
+        :param holidays: list of holidays, by default the holidays of each year
+        :param magn: 'te' for energy periods or 'tp' for power periods
+        :return: numpy array of period codes (None if there is no period)
+        """
+        walls, instants = walls_and_instants(datetimes)
+        return self._classify(walls, instants, holidays, magn)
+
+    def get_periods_for_range(self, start, end, holidays=None, magn='te'):
+        """Get the period code of every hour from start to end (included).
+
+        The hours are the ones from adding hours to start, as
+        `start + timedelta(hours=n)` does.
+        """
+        walls, instants = hourly_range(start, end)
+        return self._classify(walls, instants, holidays, magn)
+
+    def classify_arrays(self, walls, instants, holidays=None, magn='te'):
+        """Get the period code of each hour given by its wall time and its
+        UTC instant, as returned by walls_and_instants.
+        """
+        return self._classify(walls, instants, holidays, magn)
+
+    def _classify(self, walls, instants, holidays, magn):
+        codes = np.full(len(walls), None, dtype=object)
+        if not len(walls):
+            return codes
+        days = walls.astype('datetime64[D]')
+        hours = ((walls - days) // np.timedelta64(1, 'h')).astype(np.int64)
+        holiday = get_holidays_mask(days, holidays)
+        has_station_periods, daytype_zones = self._get_periods_layout()
+
+        # Every kind of day (holiday, station and daytypes) gets an integer
+        # key in mixed radix, one digit for each component
+        kinds = holiday.astype(np.int64)
+        digits = [(False, True)]
+        if has_station_periods:
+            digits.append(('winter', 'summer'))
+            kinds += 2 * (get_stations(instants) == 'summer')
+        else:
+            digits.append((None, ))
+        for zone in daytype_zones:
+            daytypes = _get_daytypes(days, zone).astype(np.int64)
+            daytypes[holiday] = DAYTYPES.index('D')
+            kinds += int(np.prod([len(d) for d in digits])) * daytypes
+            digits.append(DAYTYPES)
+
+        for kind in np.unique(kinds):
+            mask = kinds == kind
+            kind = int(kind)
+            values = []
+            for digit in digits:
+                kind, pos = divmod(kind, len(digit))
+                values.append(digit[pos])
+            table = self.get_periods_table(
+                values[0], values[1], tuple(zip(daytype_zones, values[2:])),
+                magn
+            )
+            table = np.array([p and p.code for p in table], dtype=object)
+            codes[mask] = table[hours[mask]]
+        return codes
 
     def get_hours_by_period(self, start_time, end_time, holidays=None,
                             zone='1'):
@@ -289,6 +508,7 @@ class TariffPreTD(Tariff):
     def __init__(self, code=None, **kwargs):
         self.code = code
         self._periods = tuple()
+        self._periods_tables = {}
         self.cof = None
         self.require_powers_above_min_power = False
         self.require_summer_winter_hours = True
@@ -300,6 +520,7 @@ class TariffPreTD(Tariff):
     @periods.setter
     def periods(self, value):
         self._periods = value
+        self._periods_tables = {}
         if self.require_summer_winter_hours:
             hours = {
                 'holidays': [],
@@ -351,6 +572,26 @@ class TariffPreTD(Tariff):
     def get_max_power(self):
         return self.max_power
 
+    def get_periods_table(self, holiday, station):
+        """Get the period of every hour of a day.
+
+        Hours are indexed from 1 to 24 (index 0 is unused).
+        """
+        key = (holiday, station)
+        table = self._periods_tables.get(key)
+        if table is None:
+            table = [None] * 25
+            has_holidays_periods = self.has_holidays_periods
+            for period in self.periods:
+                if period.holiday == holiday or not has_holidays_periods:
+                    for range_h in getattr(period, '%s_hours' % station):
+                        for hour in range(max(range_h[0] + 1, 1), min(range_h[1], 24) + 1):
+                            if table[hour] is None:
+                                table[hour] = period
+            table = tuple(table)
+            self._periods_tables[key] = table
+        return table
+
     def get_period_by_date(self, date_time):
         datetime_previous_hour = date_time - timedelta(hours=1)
         station = get_station(datetime_previous_hour)
@@ -364,12 +605,33 @@ class TariffPreTD(Tariff):
 
         # Map hour 0 to 24
         hour = date_time.hour or 24
-        for period in self.periods:
-            if period.holiday == holiday or not self.has_holidays_periods:
-                for range_h in getattr(period, '%s_hours' % station):
-                    if range_h[0] < hour <= range_h[1]:
-                        return period
-        return None
+        return self.get_periods_table(holiday, station)[hour]
+
+    def _classify(self, walls, instants, holidays=None, magn='te'):
+        if magn != 'te':
+            # The periods of the hours are the ones of get_period_by_date
+            raise ValueError(
+                'Tariff {0} only classifies the energy periods'.format(
+                    self.code
+                )
+            )
+        # The day and the station are the ones of the previous hour
+        codes = np.full(len(walls), None, dtype=object)
+        days = (walls - np.timedelta64(1, 'h')).astype('datetime64[D]')
+        holiday = get_holidays_mask(days, holidays)
+        summer = get_stations(instants - 3600) == 'summer'
+        hours = walls - walls.astype('datetime64[D]')
+        hours = (hours // np.timedelta64(1, 'h')).astype(np.int64)
+        # Map hour 0 to 24
+        hours[hours == 0] = 24
+        for is_holiday in (False, True):
+            for is_summer, station in ((False, 'winter'), (True, 'summer')):
+                mask = (holiday == is_holiday) & (summer == is_summer)
+                if mask.any():
+                    table = self.get_periods_table(is_holiday, station)
+                    table = np.array([p and p.code for p in table], dtype=object)
+                    codes[mask] = table[hours[mask]]
+        return codes
 
 
     @property
@@ -784,12 +1046,7 @@ class T31A(T30A):
         return consumptions
 
     def apply_curve_losses(self, measures):
-        for idx, measure in enumerate(measures):
-            values = measure._asdict()
-            consumption = my_round(measure.measure * (1 + self.losses), 2) + my_round(0.01 * self.kva, 2)
-            values['measure'] = consumption
-            measures[idx] = measure._replace(**values)
-        return measures
+        return apply_curve_losses(measures, self.losses, self.kva)
 
     def evaluate_powers(self, powers, allow_zero_power=False):
         super(T31A, self).evaluate_powers(powers, allow_zero_power=allow_zero_power)
@@ -1115,12 +1372,7 @@ class T61TD(T30TD):
             self.low_voltage_measure = False
 
     def apply_curve_losses(self, measures):
-        for idx, measure in enumerate(measures):
-            values = measure._asdict()
-            consumption = my_round(measure.measure * (1 + self.losses), 2) + my_round(0.01 * self.kva, 2)
-            values['measure'] = consumption
-            measures[idx] = measure._replace(**values)
-        return measures
+        return apply_curve_losses(measures, self.losses, self.kva)
 
 
 class T62TD(T61TD):
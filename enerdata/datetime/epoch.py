@@ -0,0 +1,118 @@
+from datetime import datetime, timedelta
+import numpy as np
+from .timezone import TIMEZONE
+from .station import _get_dst_transitions
+
+EPOCH = datetime(1970, 1, 1)
+
+
+def to_epoch_seconds(dt):
+    """Seconds since epoch of the UTC instant of a datetime.
+
+    Naive datetimes are localized with TIMEZONE.
+    """
+    if dt.tzinfo is None or dt.utcoffset() is None:
+        dt = TIMEZONE.localize(dt)
+    return int((dt.replace(tzinfo=None) - dt.utcoffset() - EPOCH).total_seconds())
+
+
+def walls_and_instants(datetimes):
+    """Split datetimes in their wall clock time and their UTC instant.
+
+    :param datetimes: iterable of datetimes
+    :return: (datetime64[s] array of wall times, int64 array of epoch seconds)
+    """
+    walls = []
+    offsets = []
+    for dt in datetimes:
+        if dt.tzinfo is None or dt.utcoffset() is None:
+            offset = TIMEZONE.localize(dt).utcoffset()
+        else:
+            offset = dt.utcoffset()
+        walls.append(dt.replace(tzinfo=None))
+        offsets.append(offset.days * 86400 + offset.seconds)
+    walls = np.array(walls, dtype='datetime64[s]')
+    instants = walls.astype(np.int64) - np.array(offsets, dtype=np.int64)
+    return walls, instants
+
+
+def hourly_range(start, end):
+    """Hours from start to end (both included) as start + n * 1h does.
+
+    Aware datetimes keep the UTC offset of start, as the sum of a timedelta
+    does with pytz.
+
+    :return: (datetime64[s] array of wall times, int64 array of epoch seconds)
+    """
+    n_hours = hours_between(start, end)
+    if start.tzinfo is None or start.utcoffset() is None:
+        return walls_and_instants(
+            start + timedelta(hours=n) for n in range(n_hours)
+        )
+    steps = np.arange(n_hours, dtype=np.int64) * 3600
+    wall = np.datetime64(start.replace(tzinfo=None), 's')
+    walls = wall + steps.astype('timedelta64[s]')
+    instants = to_epoch_seconds(start) + steps
+    return walls, instants
+
+
+def hours_between(start, end):
+    """Number of hours from start to end (both included)."""
+    if end < start:
+        return 0
+    return int((end - start).total_seconds() // 3600) + 1
+
+
+def _get_transitions_index(instants):
+    transition_instants = _get_dst_transitions(TIMEZONE)[0]
+    idx = np.searchsorted(transition_instants, instants, side='right') - 1
+    return np.maximum(idx, 0)
+
+
+def get_utc_offsets(instants):
+    """UTC offsets of TIMEZONE in seconds at the given epoch seconds."""
+    offsets = _get_dst_transitions(TIMEZONE)[2]
+    return offsets[_get_transitions_index(instants)]
+
+
+def to_epoch_hours(datetimes):
+    """UTC epoch hours of normalized TIMEZONE datetimes.
+
+    :param datetimes: iterable of aware datetimes on the hour
+    :return: int64 array of hours since epoch
+    :raises TypeError: if a datetime can not be rebuilt from its epoch hour
+    """
+    ordinal = EPOCH.toordinal()
+    walls = []
+    offsets = []
+    for dt in datetimes:
+        if getattr(dt.tzinfo, 'zone', None) != TIMEZONE.zone:
+            raise TypeError('{0} is not a {1} datetime'.format(dt, TIMEZONE))
+        if dt.minute or dt.second or dt.microsecond:
+            raise TypeError('{0} is not on the hour'.format(dt))
+        offset = dt.utcoffset()
+        walls.append((dt.toordinal() - ordinal) * 24 + dt.hour)
+        offsets.append(offset.days * 86400 + offset.seconds)
+    offsets = np.array(offsets, dtype=np.int64)
+    instants = np.array(walls, dtype=np.int64) * 3600 - offsets
+    if (offsets != get_utc_offsets(instants)).any():
+        raise TypeError('Datetimes must be normalized')
+    return instants // 3600
+
+
+def from_epoch_hours(hours):
+    """Normalized TIMEZONE datetimes of UTC epoch hours."""
+    instants = np.asarray(hours, dtype=np.int64) * 3600
+    idx = _get_transitions_index(instants)
+    _, _, offsets, tzinfos = _get_dst_transitions(TIMEZONE)
+    walls = (instants + offsets[idx]).astype('datetime64[s]').astype(object)
+    return [
+        datetime(w.year, w.month, w.day, w.hour, tzinfo=tzinfos[i])
+        for w, i in zip(walls, idx.tolist())
+    ]
+
+
+def from_epoch_hour(hour):
+    """Normalized TIMEZONE datetime of an UTC epoch hour."""
+    utc = EPOCH + timedelta(hours=int(hour))
+    return TIMEZONE.fromutc(utc.replace(tzinfo=TIMEZONE))
@@ -1,7 +1,25 @@
+from __future__ import absolute_import
+from ..cache import LRUCache
 from ..calendars import REECalendar
 
 CALENDAR = REECalendar()
 
+# Holidays by (calendar class, year) shared by the whole process
+HOLIDAYS_CACHE = LRUCache(maxsize=64)
 
-def get_holidays(year):
-    return CALENDAR.holidays_set(year)
+
+def get_holidays(year, calendar=None):
+    """Get the holidays of a year.
+
+    :param year: year of the holidays
+    :param calendar: workalendar calendar, by default REECalendar
+    :return: frozenset of dates
+    """
+    if calendar is None:
+        calendar = CALENDAR
+    key = (type(calendar), year)
+    holidays = HOLIDAYS_CACHE.get(key)
+    if holidays is None:
+        holidays = frozenset(calendar.holidays_set(year))
+        HOLIDAYS_CACHE[key] = holidays
+    return holidays
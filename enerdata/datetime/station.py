@@ -1,4 +1,5 @@
 from datetime import datetime
+import numpy as np
 from .timezone import TIMEZONE
 
 
@@ -10,3 +11,44 @@ def get_station(dt):
         return 'summer'
     else:
         return 'winter'
+
+
+_TRANSITIONS = {}
+
+
+def _get_dst_transitions(tz):
+    """UTC instants where the offset of the timezone changes.
+
+    :return: (int64 array of epoch seconds, boolean array of dst,
+              int64 array of UTC offsets in seconds, list of tzinfos)
+    """
+    transitions = _TRANSITIONS.get(tz.zone)
+    if transitions is None:
+        utc_times = getattr(tz, '_utc_transition_times', None)
+        if utc_times:
+            instants = np.array(utc_times, dtype='datetime64[s]').astype(np.int64)
+            infos = tz._transition_info
+            tzinfos = [tz._tzinfos[info] for info in infos]
+        else:
+            instants = np.zeros(1, dtype=np.int64)
+            infos = [(tz.utcoffset(datetime(1970, 1, 1)), None, None)]
+            tzinfos = [tz]
+        dst = np.array([bool(info[1]) for info in infos])
+        offsets = np.array([
+            info[0].days * 86400 + info[0].seconds for info in infos
+        ], dtype=np.int64)
+        transitions = (instants, dst, offsets, tzinfos)
+        _TRANSITIONS[tz.zone] = transitions
+    return transitions
+
+
+def get_stations(instants):
+    """Vectorized get_station over UTC instants.
+
+    :param instants: array of seconds since epoch (UTC)
+    :return: array of 'summer' and 'winter' strings
+    """
+    transition_instants, dst = _get_dst_transitions(TIMEZONE)[:2]
+    idx = np.searchsorted(transition_instants, instants, side='right') - 1
+    is_dst = dst[np.maximum(idx, 0)]
+    return np.where(is_dst, 'summer', 'winter')
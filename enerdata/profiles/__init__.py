@@ -1,10 +1,17 @@
 try:
-    from collections import Counter
+    from collections import namedtuple, Counter
 except ImportError:
-    from backport_collections import Counter
-from decimal import Decimal, getcontext
+    from backport_collections import namedtuple, Counter
+from decimal import Context, Decimal, ROUND_HALF_UP
+from itertools import repeat
+from six import string_types, integer_types
 
 import math
+import numpy as np
+
+# Between 6 and 10 to get same behaviour in Python 2.7 and Python 3.11
+DRAG_CONTEXT = Context(prec=10)
+HALF = Decimal('0.5')
 
 
 def my_round(x, d=0):
@@ -16,15 +23,148 @@ def my_round(x, d=0):
         return float(math.ceil((x * p) - 0.5))/p
 
 
+def round_array(values, d=0):
+    """my_round of every value, half away from zero.
+
+    :param values: array-like of numbers
+    :return: float64 array
+    """
+    x = np.asarray(values, dtype=np.float64)
+    p = 10 ** d
+    rounded = np.where(
+        x > 0, np.floor((x * p) + 0.5), np.ceil((x * p) - 0.5)
+    )
+    # Adding 0.0 turns -0.0 into 0.0 as float(math.ceil(-0.4)) does
+    return (rounded + 0.0) / p
+
+
+def is_same_number(a, b):
+    """Check if two numbers are dragged the same, as they have the same type
+    and the same digits."""
+    if type(a) is not type(b) or a != b:
+        return False
+    return (
+        isinstance(a, integer_types) or (type(a) is float and a != 0)
+        or str(a) == str(b)
+    )
+
+
+DragChain = namedtuple('DragChain', ['numbers', 'residue', 'aprox', 'drags'])
+
+
 class Dragger(Counter):
 
+    # Numbers dragged at once by drag_chain before looking for the drag of
+    # the previous chain
+    chain_block = 64
+
     def drag(self, number, key='default'):
-        getcontext().prec = 10  # Between 6 and 10 to get same behaviour in Python 2.7 and Python 3.11
-        if number == 0 and abs(self[key]) == Decimal('0.5'):
+        residue = self[key]
+        if number == 0 and abs(residue) == HALF:
             # Avoid oscillation between -1 and 1 and dragging 0.5 and -0.5
             return number
 
-        number = Decimal(str(number)) + self[key]
-        aprox = int(my_round(number))
-        self[key] = number - aprox
+        number = DRAG_CONTEXT.add(Decimal(str(number)), residue)
+        # Half away from zero as my_round
+        aprox = int(number.to_integral_value(ROUND_HALF_UP))
+        self[key] = DRAG_CONTEXT.subtract(number, aprox)
         return aprox
+
+    def drag_many(self, numbers, keys='default'):
+        """Drag a sequence of numbers as drag does with every one.
+
+        :param numbers: iterable of numbers
+        :param keys: key of all the numbers or a sequence with the key of
+                     every number
+        :return: (list of the integers of the numbers, list of the drag of
+                 the key after every number)
+        """
+        if isinstance(keys, string_types):
+            keys = repeat(keys)
+        add = DRAG_CONTEXT.add
+        subtract = DRAG_CONTEXT.subtract
+        get = self.get
+        aprox = []
+        drags = []
+        for number, key in zip(numbers, keys):
+            residue = get(key, 0)
+            if number == 0 and abs(residue) == HALF:
+                # Avoid oscillation between -1 and 1 and dragging 0.5 and -0.5
+                aprox.append(number)
+            else:
+                number = add(Decimal(str(number)), residue)
+                value = int(number.to_integral_value(ROUND_HALF_UP))
+                residue = subtract(number, value)
+                self[key] = residue
+                aprox.append(value)
+            drags.append(residue)
+        return aprox, drags
+
+    def drag_chain(self, numbers, key='default', previous=None):
+        """Drag a sequence of numbers with a key as drag_many does, reusing
+        the result of a previous chain.
+
+        The integers and drags of the previous chain are kept up to its first
+        changed number, and from the number where the rest of the numbers are
+        the same and the drag before it is the same. A previous chain that
+        started with another drag of the key is not reused.
+
+        :param numbers: iterable of numbers
+        :param previous: DragChain returned before by drag_chain, or None
+        :return: DragChain with the numbers, the drag of the key before them,
+                 the integers and the drag after every number
+        """
+        numbers = list(numbers)
+        residue = self.get(key)
+        if previous is None or not is_same_number(previous.residue, residue):
+            aprox, drags = self.drag_many(numbers, key)
+            return DragChain(numbers, residue, aprox, drags)
+        old_numbers = previous.numbers
+        first = 0
+        for old, number in zip(old_numbers, numbers):
+            if not is_same_number(old, number):
+                break
+            first += 1
+        same_tail = 0
+        max_tail = min(len(old_numbers), len(numbers)) - first
+        for old, number in zip(reversed(old_numbers), reversed(numbers)):
+            if same_tail == max_tail or not is_same_number(old, number):
+                break
+            same_tail += 1
+        aprox = previous.aprox[:first]
+        drags = previous.drags[:first]
+        if first:
+            self[key] = drags[-1]
+        tail = len(numbers) - same_tail
+        changed_aprox, changed_drags = self.drag_many(numbers[first:tail], key)
+        aprox.extend(changed_aprox)
+        drags.extend(changed_drags)
+        shift = len(old_numbers) - len(numbers)
+        idx = tail
+        while idx < len(numbers):
+            old_idx = idx + shift
+            if old_idx:
+                old_drag = previous.drags[old_idx - 1]
+            else:
+                old_drag = previous.residue
+            if is_same_number(self.get(key), old_drag):
+                # The rest of the chain is the same as the previous one
+                aprox.extend(previous.aprox[old_idx:])
+                drags.extend(previous.drags[old_idx:])
+                if drags:
+                    self[key] = drags[-1]
+                break
+            # Drag a block and look for the same drag in the previous chain
+            block_aprox, block_drags = self.drag_many(
+                numbers[idx:idx + self.chain_block], key
+            )
+            size = len(block_drags)
+            for pos, drag in enumerate(block_drags[:-1]):
+                if is_same_number(drag, previous.drags[old_idx + pos]):
+                    size = pos + 1
+                    self[key] = drag
+                    break
+            aprox.extend(block_aprox[:size])
+            drags.extend(block_drags[:size])
+            idx += size
+        return DragChain(numbers, residue, aprox, drags)
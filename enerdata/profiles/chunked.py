@@ -0,0 +1,216 @@
+# -*- coding: utf-8 -*-
+from __future__ import division
+
+import logging
+try:
+    from collections import Counter
+except ImportError:
+    from backport_collections import Counter
+from datetime import datetime, timedelta
+
+from dateutil.relativedelta import relativedelta
+
+from . import Dragger
+from .profile import Profile, REEProfile
+from ..contracts.tariff import Tariff
+from ..datetime.epoch import hours_between, to_epoch_seconds
+from ..datetime.timezone import TIMEZONE
+
+
+logger = logging.getLogger(__name__)
+
+
+class ChunkedProfile(object):
+    """Estimate a long profile by chunks of hours.
+
+    The measures are read chunk by chunk twice: first to sum the consumption
+    and the coefficients of the gaps of every period, then to estimate the
+    gaps of every chunk with the Dragger of the previous chunks. Only the
+    measures of a chunk are in memory at once and the estimated measures are
+    the same as estimating the whole profile with Profile.estimate.
+    """
+
+    def __init__(self, start, end, measures, accumulated=None,
+                 drag_by_periods=True, chunk_hours=None):
+        """
+        :param measures: iterable of ProfileHour sorted by date that can be
+                         iterated again, or a function returning a new
+                         iterator of them
+        :param chunk_hours: number of hours of every chunk, by default the
+                            chunks are the months
+        """
+        assert chunk_hours is None or chunk_hours > 0, \
+            "chunk_hours must be a positive number"
+        self.start_date = start
+        self.end_date = end
+        self.measures = measures
+        self.chunk_hours = chunk_hours
+        self.profile_class = REEProfile
+        # Profile without measures for the balance and the coefficients
+        self._profile = Profile(
+            start, end, [], accumulated, drag_by_periods
+        )
+        self.accumulated = self._profile.accumulated
+        self.drag_by_periods = drag_by_periods
+        # The coefficients of the last chunk, see _get_coefficients
+        self._coefficients = (None, None)
+
+    @property
+    def n_hours(self):
+        return hours_between(self.start_date, self.end_date)
+
+    def get_chunks(self):
+        """Get the chunks of hours from start to end.
+
+        The hours are `start + timedelta(hours=n)` as the gaps of a profile.
+
+        :return: list of (first hour, last hour) of every chunk
+        """
+        n_hours = self.n_hours
+        if self.chunk_hours:
+            offsets = list(range(0, n_hours, self.chunk_hours))
+        else:
+            # The month of an hour is the month of the hour ending at it
+            start = to_epoch_seconds(self.start_date)
+            first = self.start_date - timedelta(hours=1)
+            month = datetime(first.year, first.month, 1)
+            offsets = [0]
+            while True:
+                month += relativedelta(months=1)
+                offset = (to_epoch_seconds(
+                    TIMEZONE.localize(month + timedelta(hours=1))
+                ) - start) // 3600
+                if offset >= n_hours:
+                    break
+                if offset > 0:
+                    offsets.append(offset)
+        offsets.append(n_hours)
+        return [
+            (self.start_date + timedelta(hours=first),
+             self.start_date + timedelta(hours=last - 1))
+            for first, last in zip(offsets, offsets[1:])
+        ]
+
+    def _iter_chunks(self):
+        """Iterate the profiles of the measures of every chunk.
+
+        The measures before the start are in the first chunk and the
+        measures after the end are in the last one.
+        """
+        measures = self.measures
+        if callable(measures):
+            measures = measures()
+        measures = iter(measures)
+        chunks = self.get_chunks()
+        measure = next(measures, None)
+        last = None
+        for idx, (first_hour, last_hour) in enumerate(chunks):
+            is_last = idx == len(chunks) - 1
+            chunk_measures = []
+            while measure is not None:
+                date = measure.date
+                if last is not None and date < last:
+                    raise ValueError('Measures must be sorted by date')
+                if date > last_hour and not is_last:
+                    break
+                last = date
+                chunk_measures.append(measure)
+                measure = next(measures, None)
+            chunk = Profile(
+                first_hour, last_hour, chunk_measures,
+                drag_by_periods=self.drag_by_periods
+            )
+            chunk.profile_class = self.profile_class
+            yield chunk
+
+    def estimate(self, tariff, balance):
+        """Estimate the gaps of every chunk as Profile.estimate does.
+
+        :return: iterator of the estimated Profile of every chunk, without
+                 the invalid measures
+        """
+        assert isinstance(tariff, Tariff)
+        logger.debug('Estimating by chunks for tariff: {0}'.format(
+            tariff.code
+        ))
+        profile = self._profile
+        profile.profile_class = self.profile_class
+        self._coefficients = (None, None)
+        balance = profile._adapt_balance(tariff, balance)
+
+        # The sums of the whole profile, in the same order of a single pass
+        consumption_per_period = Profile._sum_per_period(tariff, [], [])
+        cofs_per_period = Counter()
+        for chunk in self._iter_chunks():
+            periods = chunk._get_measures_periods(tariff, valid=True)
+            measures = chunk._get_column('measure', valid=True)
+            for period, measure in zip(periods, measures):
+                consumption_per_period[period] += measure
+            if not len(chunk.gaps):
+                continue
+            gaps_periods = chunk._get_gaps_periods(tariff)
+            period_cofs = chunk._get_gaps_cofs(
+                tariff, self._get_coefficients(chunk)
+            )[0]
+            for period in set(gaps_periods.tolist()):
+                cofs_per_period[period] = sum(
+                    period_cofs[gaps_periods == period].tolist(),
+                    cofs_per_period.get(period, 0)
+                )
+        energy_per_period = {}
+        for period in consumption_per_period:
+            energy_per_period[period] = (
+                balance[period] - consumption_per_period[period]
+            )
+
+        dragger = None
+        for chunk in self._iter_chunks():
+            gaps_measures = []
+            gaps_accumulated = []
+            if len(chunk.gaps):
+                gaps_periods = chunk._get_gaps_periods(tariff)
+                gaps_cofs = chunk._get_gaps_cofs(
+                    tariff, self._get_coefficients(chunk)
+                )[1]
+                gaps_energy = chunk._get_gaps_energy(
+                    gaps_periods, gaps_cofs, energy_per_period,
+                    cofs_per_period
+                )
+                if self.drag_by_periods:
+                    keys = gaps_periods.tolist()
+                else:
+                    keys = 'default'
+                if dragger is None:
+                    # Initialize the Dragger with the accumulated value at
+                    # the first gap of the profile
+                    dragger = Dragger()
+                    dragger.drag(
+                        self.accumulated,
+                        key=keys if keys == 'default' else keys[0]
+                    )
+                gaps_measures, gaps_accumulated = dragger.drag_many(
+                    gaps_energy, keys
+                )
+            yield Profile(
+                chunk.start_date, chunk.end_date,
+                chunk._merge_gaps(gaps_measures, gaps_accumulated)
+            )
+
+    def _get_coefficients(self, chunk):
+        """Get the coefficients to estimate a chunk, the ones of the previous
+        chunk if they are of the same range."""
+        profile = self._profile
+        first, last = profile._get_estimate_range(
+            chunk.start_date, chunk.end_date
+        )
+        if profile._has_month_coefficients():
+            # The coefficients of REEProfile are of whole months
+            first = (first.year, first.month)
+            last = (last.year, last.month)
+        key, cofs = self._coefficients
+        if key != (self.profile_class, first, last):
+            cofs = profile._get_estimate_coefficients(
+                chunk.start_date, chunk.end_date
+            )
+            self._coefficients = ((self.profile_class, first, last), cofs)
+        return cofs
@@ -0,0 +1,162 @@
+# -*- coding: utf-8 -*-
+from __future__ import division
+
+import logging
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime, timedelta
+
+from dateutil.relativedelta import relativedelta
+
+from .profile import Coefficients, Profiler, REEProfile
+from ..datetime.epoch import from_epoch_hour, hours_between, to_epoch_seconds
+from ..datetime.timezone import TIMEZONE
+
+
+logger = logging.getLogger(__name__)
+
+# Coefficients loaded by the worker process and the months kept in the cache
+# of REEProfile, by directory
+_WORKER_COEFFICIENTS = {}
+
+
+def set_ree_months(coefficients):
+    """Keep the whole months of the coefficients in the cache of REEProfile.
+
+    :return: list of the (year, month) kept
+    """
+    months = []
+    if not len(coefficients):
+        return months
+    hours = coefficients.hours
+    first = from_epoch_hour(hours[0])
+    last = from_epoch_hour(hours[-1])
+    month = date(first.year, first.month, 1)
+    while month <= last.date():
+        next_month = month + relativedelta(months=1)
+        # The hours of REEProfile.get, from 01:00 of the first day to 00:00
+        # of the next month
+        start = TIMEZONE.localize(datetime(month.year, month.month, 1, 1))
+        n_hours = hours_between(start, TIMEZONE.localize(datetime(
+            next_month.year, next_month.month, 1
+        )))
+        try:
+            pos, end_pos = coefficients.get_range_positions(
+                month, next_month - timedelta(days=1)
+            )
+        except ValueError:
+            pos = end_pos = 0
+        if (end_pos - pos == n_hours
+                and hours[pos] == to_epoch_seconds(start) // 3600
+                and hours[end_pos - 1] - hours[pos] + 1 == n_hours):
+            key = '%(year)s%(month)02i' % {
+                'year': month.year, 'month': month.month
+            }
+            REEProfile._CACHE[key] = coefficients._get_coefs(pos, end_pos)
+            months.append((month.year, month.month))
+        month = next_month
+    return months
+
+
+def _get_coefficients(directory):
+    if directory not in _WORKER_COEFFICIENTS:
+        # Drop the months of the coefficients loaded before
+        for _, months in _WORKER_COEFFICIENTS.values():
+            for year, month in months:
+                try:
+                    del REEProfile._CACHE['%(year)s%(month)02i' % locals()]
+                except KeyError:
+                    pass
+        _WORKER_COEFFICIENTS.clear()
+        coefficients = Coefficients.load(directory)
+        _WORKER_COEFFICIENTS[directory] = (
+            coefficients, set_ree_months(coefficients)
+        )
+    return _WORKER_COEFFICIENTS[directory][0]
+
+
+def _profile(directory, tariff, drag_method, measures_sets):
+    profiler = Profiler(_get_coefficients(directory))
+    return list(profiler.profile_batch(tariff, measures_sets, drag_method))
+
+
+def _estimate(directory, method, args, items):
+    _get_coefficients(directory)
+    return [
+        getattr(profile, method)(tariff, balance, *args)
+        for profile, tariff, balance in items
+    ]
+
+
+class ParallelProfiler(object):
+    """Profile and estimate many supply points in a pool of processes.
+
+    The coefficients are saved once in memory mapped files shared by all the
+    processes instead of being sent with every task. The results are in the
+    order of the given items, the same for any number of workers and any
+    chunk size.
+    """
+
+    def __init__(self, coefficients, max_workers=None, chunksize=16):
+        """
+        :param coefficients: Coefficients of the profiler. Its whole months
+                             are used as the months of REEProfile by the
+                             estimations
+        :param max_workers: number of processes, by default the number of
+                            CPUs
+        :param chunksize: number of items sent to a process at once
+        """
+        assert chunksize > 0, "chunksize must be a positive number"
+        self.coefficients = coefficients
+        self.max_workers = max_workers
+        self.chunksize = chunksize
+
+    def profile(self, tariff, measures_sets, drag_method='hour'):
+        """Profiler.profile_columns of every list of measures.
+
+        :param measures_sets: iterable of lists of measures, one for every
+                              supply point
+        :return: list with the columns of every list of measures
+        """
+        return self._map(_profile, (tariff, drag_method), measures_sets)
+
+    def estimate(self, items):
+        """Profile.estimate of every (profile, tariff, balance).
+
+        :return: list with the estimated Profile of every item
+        """
+        return self._map(_estimate, ('estimate', ()), items)
+
+    def fixit(self, items, diff=0):
+        """Profile.fixit of every (profile, tariff, balance).
+
+        :return: list with the fixed Profile of every item
+        """
+        return self._map(_estimate, ('fixit', (diff, )), items)
+
+    def _map(self, function, args, items):
+        items = list(items)
+        chunks = [
+            items[idx:idx + self.chunksize]
+            for idx in range(0, len(items), self.chunksize)
+        ]
+        if not chunks:
+            return []
+        directory = tempfile.mkdtemp(prefix='enerdata-')
+        try:
+            self.coefficients.save(directory)
+            logger.debug('Processing {0} items in {1} chunks'.format(
+                len(items), len(chunks)
+            ))
+            with ProcessPoolExecutor(self.max_workers) as executor:
+                futures = [
+                    executor.submit(function, directory, *(args + (chunk, )))
+                    for chunk in chunks
+                ]
+                results = []
+                for future in futures:
+                    results.extend(future.result())
+            return results
+        finally:
+            shutil.rmtree(directory, ignore_errors=True)
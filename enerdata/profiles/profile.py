@@ -3,33 +3,41 @@ from __future__ import division
 
 import bisect
 import logging
+import os
+import socket
 try:
     from collections import namedtuple, Counter
 except ImportError:
     from backport_collections import namedtuple, Counter
-from datetime import datetime, date, timedelta
-from multiprocessing import Lock
 try:
-    from StringIO import StringIO
+    from collections.abc import MutableSequence, Sequence
 except ImportError:
-    from io import StringIO
+    from collections import MutableSequence, Sequence
+from datetime import datetime, date, timedelta
+from multiprocessing import Lock
+from multiprocessing.pool import ThreadPool
+import threading
 from dateutil.relativedelta import relativedelta
 from decimal import Decimal
-from six import string_types
+from six import string_types, integer_types
 
+from ..cache import LRUCache, DiskCache
 from ..profiles import Dragger
 from ..contracts.tariff import Tariff, T30A_one_period, T31A_one_period, T31A
 from ..datetime.timezone import TIMEZONE
-from ..metering.measure import Measure, EnergyMeasure
-from ..datetime.solar_hour import convert_to_solar_hour
+from ..metering.measure import EnergyMeasure
+from ..datetime.epoch import (
+    EPOCH, to_epoch_seconds, to_epoch_hours, from_epoch_hours, from_epoch_hour,
+    get_utc_offsets, hours_between, hourly_range, walls_and_instants
+)
 
 from os import path
 from six import BytesIO
+import numpy as np
 import pandas as pd
 import bz2
-import csv
-import gzip
 import requests
+import zlib
 
 try:
     import httplib
@@ -69,40 +77,305 @@ class Coefficent(namedtuple('Coefficient', ['hour', 'cof'])):
         return self.hour >= other.hour
 
 
+class CoefficientsList(list):
+    """List of the Coefficent of some Coefficients, the columns of the
+    coefficients are built again from the list when it is changed."""
+
+    def _changed(self):
+        owner = getattr(self, '_owner', None)
+        if owner is not None and owner._coefs is self:
+            owner._columns = None
+
+
+def _changing_list_method(name):
+    method = getattr(list, name)
+
+    def changing(self, *args, **kwargs):
+        result = method(self, *args, **kwargs)
+        self._changed()
+        return result
+    changing.__name__ = name
+    return changing
+
+
+for _name in ('append', 'extend', 'insert', 'remove', 'pop', 'sort',
+              'reverse', 'clear', '__setitem__', '__delitem__', '__iadd__',
+              '__imul__', '__setslice__', '__delslice__'):
+    if hasattr(list, _name):
+        setattr(CoefficientsList, _name, _changing_list_method(_name))
+
+
+def _coefficients_column(idx):
+    def get_column(self):
+        if self._columns is None:
+            self._columns = self._to_columns(self._coefs)
+        return self._columns[idx]
+
+    def set_column(self, column):
+        columns = list((self.hours, self.values, self._missing))
+        columns[idx] = column
+        self._columns = tuple(columns)
+        self._coefs = None
+    return property(get_column, set_column)
+
+
 class Coefficients(object):
+    """Hourly coefficients stored by columns.
+
+    The hours are kept as sorted UTC epoch hours and every coefficient as a
+    float64 array, the Coefficent tuples are built when they are accessed with
+    the normalized dates of TIMEZONE.
+    """
+
     def __init__(self, coefs=None):
         if coefs is None:
             coefs = []
         assert isinstance(coefs, list)
-        self.coefs = list(coefs)
+        self._set_coefs(coefs)
+
+    hours = _coefficients_column(0)
+    values = _coefficients_column(1)
+    _missing = _coefficients_column(2)
+
+    def _set_coefs(self, coefs):
+        self._columns = self._to_columns(coefs)
+        self._cache_coefs(coefs)
+
+    def _cache_coefs(self, coefs):
+        self._coefs = CoefficientsList(coefs)
+        self._coefs._owner = self
+
+    @staticmethod
+    def _to_columns(coefs):
+        try:
+            hours = to_epoch_hours(c[0] for c in coefs)
+        except TypeError:
+            walls, instants = walls_and_instants(c[0] for c in coefs)
+            if (instants % 3600).any():
+                raise ValueError('Coefficients must be hourly')
+            hours = instants // 3600
+        values = {}
+        missing = {}
+        names = list(coefs[0][1]) if coefs else []
+        try:
+            for name in names:
+                values[name] = np.array(
+                    [c[1][name] for c in coefs], dtype=np.float64
+                )
+            if any(len(c[1]) != len(names) for c in coefs):
+                raise KeyError
+        except KeyError:
+            # Not all the hours have the same coefficients
+            names = []
+            for c in coefs:
+                for name in c[1]:
+                    if name not in names:
+                        names.append(name)
+            for name in names:
+                values[name] = np.array(
+                    [c[1].get(name, np.nan) for c in coefs], dtype=np.float64
+                )
+                is_missing = np.array([name not in c[1] for c in coefs])
+                if is_missing.any():
+                    missing[name] = is_missing
+        return hours, values, missing
+
+    @classmethod
+    def from_columns(cls, hours, values):
+        """Coefficients of the UTC epoch hours and the arrays of every name."""
+        coefficients = cls()
+        coefficients.hours = np.asarray(hours, dtype=np.int64)
+        coefficients.values = dict(values)
+        return coefficients
+
+    @property
+    def coefs(self):
+        """List of the Coefficent of every hour, built from the columns the
+        first time. The columns are built again when the list is changed."""
+        if self._coefs is None:
+            self._cache_coefs(self._get_coefs(0, len(self)))
+        return self._coefs
+
+    @coefs.setter
+    def coefs(self, coefs):
+        self._set_coefs(list(coefs))
+
+    def __len__(self):
+        return len(self.hours)
+
+    def _get_coefs(self, pos, end_pos):
+        dates = from_epoch_hours(self.hours[pos:end_pos])
+        names = list(self.values)
+        rows = zip(*[self.values[n][pos:end_pos].tolist() for n in names])
+        if not names:
+            rows = [()] * len(dates)
+        coefs = [
+            Coefficent(dt, dict(zip(names, row)))
+            for dt, row in zip(dates, rows)
+        ]
+        for name, missing in self._missing.items():
+            for idx in np.flatnonzero(missing[pos:end_pos]).tolist():
+                del coefs[idx].cof[name]
+        return coefs
+
+    def _get_coef(self, pos):
+        cof = dict(
+            (name, float(values[pos])) for name, values in self.values.items()
+            if name not in self._missing or not self._missing[name][pos]
+        )
+        return Coefficent(from_epoch_hour(self.hours[pos]), cof)
+
+    def _get_arrays(self):
+        names = list(self.values)
+        arrays = {'hours': self.hours, 'names': np.array(names, dtype='U')}
+        for idx, name in enumerate(names):
+            arrays['cof_{0}'.format(idx)] = self.values[name]
+            if name in self._missing:
+                arrays['missing_{0}'.format(idx)] = self._missing[name]
+        return arrays
+
+    @classmethod
+    def _from_arrays(cls, arrays, files):
+        coefficients = cls()
+        coefficients.hours = arrays['hours']
+        for idx, name in enumerate(arrays['names'].tolist()):
+            coefficients.values[name] = arrays['cof_{0}'.format(idx)]
+            missing = 'missing_{0}'.format(idx)
+            if missing in files:
+                coefficients._missing[name] = arrays[missing]
+        return coefficients
+
+    def dumps(self):
+        """Serialize the columns in the npz format of numpy."""
+        data = BytesIO()
+        np.savez_compressed(data, **self._get_arrays())
+        return data.getvalue()
+
+    @classmethod
+    def loads(cls, data):
+        """Coefficients serialized with dumps."""
+        with np.load(BytesIO(data), allow_pickle=False) as arrays:
+            return cls._from_arrays(arrays, arrays.files)
+
+    def save(self, directory):
+        """Save the columns in a .npy file each one, in the directory."""
+        for name, array in self._get_arrays().items():
+            np.save(os.path.join(directory, name + '.npy'), array)
+
+    @classmethod
+    def load(cls, directory, mmap_mode='r'):
+        """Coefficients saved with save.
+
+        By default the files are mapped in memory read only, so the processes
+        that load them share their memory.
+        """
+        arrays = {}
+        for filename in os.listdir(directory):
+            name, ext = os.path.splitext(filename)
+            if ext == '.npy':
+                arrays[name] = np.load(
+                    os.path.join(directory, filename), mmap_mode=mmap_mode,
+                    allow_pickle=False
+                )
+        return cls._from_arrays(arrays, arrays)
 
     def _check_pos(self, pos):
-        if pos == len(self.coefs):
+        if pos == len(self):
             raise ValueError('start date not found in coefficients')
 
+    def get_positions(self, instants):
+        """Position of the first coefficient at or after every instant.
+
+        Contiguous hours are indexed by their offset, without searching.
+
+        :param instants: array of UTC epoch seconds
+        :return: int64 array of positions, len(self) if there is none
+        """
+        hours = -(-np.asarray(instants, dtype=np.int64) // 3600)
+        if not len(self):
+            return np.zeros(len(hours), dtype=np.int64)
+        first = self.hours[0]
+        if self.hours[-1] - first + 1 == len(self):
+            return np.clip(hours - first, 0, len(self))
+        return np.searchsorted(self.hours, hours, side='left')
+
     def insert_coefs(self, coefs):
-        pos_0 = bisect.bisect_left(self.coefs, Coefficent(coefs[0][0], {}))
-        pos_1 = bisect.bisect_right(self.coefs, Coefficent(coefs[-1][0], {}))
+        coefs = list(coefs)
+        hours, values, missing = self._to_columns(coefs)
+        pos_0 = int(self.get_positions(hours[:1] * 3600)[0])
+        pos_1 = int(self.get_positions(hours[-1:] * 3600 + 1)[0])
         logger.debug('Deleting from {start}({pos_0}) to {end}({pos_1})'.format(
             start=coefs[0][0], end=coefs[-1][0], pos_0=pos_0, pos_1=pos_1
         ))
-        del self.coefs[pos_0:pos_1]
-        for c in reversed(coefs):
-            logger.debug('Inserting {c} into {pos_0}'.format(
-                c=c, pos_0=pos_0
-            ))
-            self.coefs.insert(pos_0, c)
+        names = list(self.values) + [n for n in values if n not in self.values]
+        size = pos_0 + len(hours) + len(self) - pos_1
+        new_values = {}
+        new_missing = {}
+        for name in names:
+            parts = []
+            missing_parts = []
+            for columns, is_missing, start, end in (
+                    (self.values, self._missing, 0, pos_0),
+                    (values, missing, 0, len(hours)),
+                    (self.values, self._missing, pos_1, len(self))):
+                if name in columns:
+                    parts.append(columns[name][start:end])
+                    if name in is_missing:
+                        missing_parts.append(is_missing[name][start:end])
+                    else:
+                        missing_parts.append(np.zeros(end - start, dtype=bool))
+                else:
+                    parts.append(np.full(end - start, np.nan))
+                    missing_parts.append(np.ones(end - start, dtype=bool))
+            new_values[name] = np.concatenate(parts) if size else np.zeros(0)
+            is_missing = np.concatenate(missing_parts).astype(bool)
+            if is_missing.any():
+                new_missing[name] = is_missing
+        cached = self._coefs
+        self._columns = (
+            np.concatenate((self.hours[:pos_0], hours, self.hours[pos_1:])),
+            new_values, new_missing
+        )
+        if cached is not None:
+            list.__setitem__(cached, slice(pos_0, pos_1), coefs)
 
     def get(self, dt):
         assert isinstance(dt, datetime)
-        if dt.dst() is None:
-            dt = TIMEZONE.localize(dt)
-        dt = TIMEZONE.normalize(dt)
-        pos = bisect.bisect_left(self.coefs, Coefficent(dt, {}))
+        hour = -(-to_epoch_seconds(dt) // 3600)
+        first = int(self.hours[0]) if len(self) else 0
+        if len(self) and int(self.hours[-1]) - first + 1 == len(self):
+            pos = min(max(hour - first, 0), len(self))
+        else:
+            pos = int(np.searchsorted(self.hours, hour, side='left'))
         self._check_pos(pos)
-        return self.coefs[pos]
-
-    def get_range(self, start, end):
+        if self._coefs is not None:
+            return self._coefs[pos]
+        return self._get_coef(pos)
+
+    def get_values(self, instants, cof, positions=None):
+        """Get the values of a coefficient as get does for many hours.
+
+        :param instants: array of UTC epoch seconds
+        :param cof: name of the coefficient
+        :param positions: positions of the coefficients, instead of instants
+        :return: float64 array with the value of the first coefficient at or
+                 after every instant
+        """
+        if positions is None:
+            positions = self.get_positions(instants)
+            if (positions == len(self)).any():
+                raise ValueError('start date not found in coefficients')
+        if cof not in self.values:
+            raise KeyError(cof)
+        if cof in self._missing and self._missing[cof][positions].any():
+            raise KeyError(cof)
+        return self.values[cof][positions]
+
+    def get_range_positions(self, start, end):
+        """Positions of the coefficients from start to end, both included.
+
+        :return: (position of the first, position after the last)
+        """
         assert isinstance(start, date)
         assert isinstance(end, date)
         start = TIMEZONE.localize(datetime(
@@ -113,10 +386,17 @@ class Coefficients(object):
         end = TIMEZONE.localize(datetime(
             end.year, end.month, end.day), is_dst=True
         ) + timedelta(seconds=1)
-        pos = bisect.bisect_left(self.coefs, Coefficent(start, {}))
+        pos, end_pos = self.get_positions(
+            [to_epoch_seconds(start), to_epoch_seconds(end)]
+        ).tolist()
         self._check_pos(pos)
-        end_pos = bisect.bisect_right(self.coefs, Coefficent(end, {}))
-        return self.coefs[pos:end_pos]
+        return pos, end_pos
+
+    def get_range(self, start, end):
+        pos, end_pos = self.get_range_positions(start, end)
+        if self._coefs is not None:
+            return self._coefs[pos:end_pos]
+        return self._get_coefs(pos, end_pos)
 
     def get_coefs_by_tariff(self, tariff, start, end):
         assert hasattr(tariff, 'get_period_by_date')
@@ -124,18 +404,34 @@ class Coefficients(object):
         assert isinstance(start, date)
         assert isinstance(end, date)
         sum_cofs = dict.fromkeys(tariff.energy_periods.keys(), 0)
-        for hour, coef in self.get_range(start, end):
-            if len(sum_cofs) > 1:
-                dt = hour - timedelta(minutes=1)
-                period = tariff.get_period_by_date(dt)
-                p_name = period.code
-            else:
-                p_name = sum_cofs.keys()[0]
-            sum_cofs[p_name] += coef[tariff.cof]
+        pos, end_pos = self.get_range_positions(start, end)
+        if end_pos <= pos:
+            return sum_cofs
+        positions = np.arange(pos, end_pos)
+        values = self.get_values(None, tariff.cof, positions=positions)
+        if len(sum_cofs) > 1:
+            instants = self.hours[pos:end_pos] * 3600
+            walls = instants + get_utc_offsets(instants)
+            periods = tariff.classify_arrays(
+                (walls - 60).astype('datetime64[s]'), instants - 60
+            )
+            for p_name in set(periods.tolist()):
+                if p_name not in sum_cofs:
+                    raise KeyError(p_name)
+                sum_cofs[p_name] += sum(values[periods == p_name].tolist())
+        else:
+            p_name = list(sum_cofs.keys())[0]
+            sum_cofs[p_name] += sum(values.tolist())
         return sum_cofs
 
 
 class Profiler(object):
+    # Keys of the values of every profiled hour
+    keys = (
+        'aprox', 'drag', 'consumption', 'consumption_date', 'sum_cofs', 'cof',
+        'period'
+    )
+
     def __init__(self, coefficient):
         self.coefficient = coefficient
 
@@ -148,6 +444,109 @@ class Profiler(object):
                             the same period
         :return:
         """
+        keys = self.keys
+        for hours, rows in self._profile_intervals(tariff, measures, drag_method):
+            columns = [rows[key] for key in keys]
+            for hour, values in zip(from_epoch_hours(hours), zip(*columns)):
+                yield hour, dict(zip(keys, values))
+
+    def profile_columns(self, tariff, measures, drag_method='hour'):
+        """Profile the measures as profile does, in typed arrays.
+
+        :return: dict with the UTC epoch hours in 'hours' and an array for
+                 every key of the hours yielded by profile: int64 'aprox',
+                 datetime64[D] 'consumption_date' (NaT without measure),
+                 unicode 'period' and float64 for the rest, but the
+                 consumption keeps its integers
+        """
+        return self._get_columns(
+            self._profile_intervals(tariff, measures, drag_method)
+        )
+
+    def profile_batch(self, tariff, measures_sets, drag_method='hour'):
+        """Profile many sets of measures of the tariff, as profile_columns.
+
+        The hours, periods and coefficients of an interval between measures
+        are computed once for all the sets of measures with that interval,
+        so every set is only scaled and dragged.
+
+        :param measures_sets: iterable of lists of measures, one for every
+                              supply point
+        :return: generator of the dict of profile_columns of every list
+        """
+        intervals = {}
+        for measures in measures_sets:
+            yield self._get_columns(self._profile_intervals(
+                tariff, measures, drag_method, intervals
+            ))
+
+    def _get_columns(self, profiled_intervals):
+        hours = [np.zeros(0, dtype=np.int64)]
+        rows = dict((key, []) for key in self.keys)
+        for interval_hours, interval_rows in profiled_intervals:
+            hours.append(interval_hours)
+            for key, values in interval_rows.items():
+                rows[key].extend(values)
+        consumption = to_column(rows['consumption'])
+        if consumption.dtype not in (np.int64, np.float64):
+            consumption = np.array(rows['consumption'], dtype=np.float64)
+        # Days since epoch of the few different dates, NaT without date
+        days = dict(
+            (d, np.iinfo(np.int64).min if d is None else
+             d.toordinal() - EPOCH.toordinal())
+            for d in set(rows['consumption_date'])
+        )
+        return {
+            'hours': np.concatenate(hours),
+            'aprox': np.array(rows['aprox'], dtype=np.int64),
+            'drag': np.array(rows['drag'], dtype=np.float64),
+            'consumption': consumption,
+            'consumption_date': np.array(
+                [days[d] for d in rows['consumption_date']], dtype=np.int64
+            ).astype('datetime64[D]'),
+            'sum_cofs': np.array(rows['sum_cofs'], dtype=np.float64),
+            'cof': np.array(rows['cof'], dtype=np.float64),
+            'period': np.array(rows['period'], dtype=np.str_)
+        }
+
+    def profile_frame(self, tariff, measures, drag_method='hour'):
+        """Profile the measures in a pandas DataFrame of profile_columns.
+
+        :return: DataFrame indexed by the hours in TIMEZONE
+        """
+        columns = self.profile_columns(tariff, measures, drag_method)
+        index = pd.to_datetime(
+            columns.pop('hours') * 3600, unit='s', utc=True
+        ).tz_convert(TIMEZONE.zone)
+        index.name = 'hour'
+        return pd.DataFrame(columns, index=index, columns=list(self.keys))
+
+    def profile_intervals(self, tariff, measures, drag_method='hour'):
+        """Profile the measures as profile does, by blocks of columns.
+
+        :return: a dict for every interval between measures with the UTC
+                 epoch hours in 'hours' and an array for every key of the
+                 hours yielded by profile
+        """
+        for hours, rows in self._profile_intervals(tariff, measures, drag_method):
+            block = {'hours': hours}
+            for key, values in rows.items():
+                dtype = None
+                if key in ('drag', 'consumption_date', 'period'):
+                    dtype = object
+                block[key] = to_column(values, dtype)
+            yield block
+
+    def _profile_intervals(self, tariff, measures, drag_method,
+                           intervals=None):
+        """Profile the intervals between the measures.
+
+        :param intervals: dict to keep the intervals of _get_interval, to
+                          share them between many calls
+        :return: generator of the results of _profile_interval
+        """
+        if intervals is None:
+            intervals = {}
         # {'PX': [(date(XXXX-XX-XX), 100), (date(XXXX-XX-XX), 110)]}
         _measures = list(measures)
         measures = {}
@@ -156,6 +555,7 @@ class Profiler(object):
             measures[m.period.code].append(m)
         measures_intervals = EnergyMeasure.intervals(_measures)
         # Detect single day profiling case
+        single_day = len(set(measures_intervals)) == 1
         if len(measures_intervals) == 1:
             measures_intervals.append(measures_intervals[-1])  # duplicate measure date to do not skip loop below
         logger.debug('Profiling {0} intervals'.format(len(measures_intervals)))
@@ -166,51 +566,177 @@ class Profiler(object):
             if idx > 0:
                 start += timedelta(days=1)
             end = measures_intervals[idx + 1]
-            logger.debug('Getting coeffs from {0} to {1}'.format(
-                start, end
-            ))
-            sum_cofs = self.coefficient.get_coefs_by_tariff(tariff, start, end)
-            dragger = Dragger()
-            for hour, cof in self.coefficient.get_range(start, end):
-                dt = hour - timedelta(minutes=1)
-                period = tariff.get_period_by_date(dt)
-                if drag_method == 'hour':
-                    dp = 'hour'
-                else:
-                    dp = period.code
-                d = hour.date()
-                if hour.hour == 0:
-                    d -= timedelta(days=1)
-                # To take the first measure
-                if d == start and len(set(measures_intervals)) != 1:  # if single day case, do not regress date
-                    d += timedelta(days=1)
-                fake_m = Measure(d, period, 0)
-                pos = bisect.bisect_left(measures.get(period.code, []), fake_m)
-                pcode = period.code
-                if pcode not in measures or pos >= len(measures[period.code]):
-                    consumption = 0
-                    consumption_date = None
-                else:
-                    consumption = measures[period.code][pos].consumption
-                    consumption_date = measures[period.code][pos].date
-                logger.debug('Hour: {0} Period: {1} Consumption: {2}'.format(
-                    hour, period.code, consumption
+            interval = intervals.get((start, end))
+            if interval is None:
+                logger.debug('Getting coeffs from {0} to {1}'.format(
+                    start, end
                 ))
-                cof = cof[tariff.cof]
-                hour_c = ((consumption * cof) / sum_cofs[period.code])
-                aprox = dragger.drag(hour_c, key=dp)
-                yield (
-                    hour,
-                    {
-                        'aprox': aprox,
-                        'drag': dragger[dp],
-                        'consumption': consumption,
-                        'consumption_date': consumption_date,
-                        'sum_cofs': sum_cofs[period.code],
-                        'cof': cof,
-                        'period': period.code
-                    }
-                )
+                interval = self._get_interval(tariff, start, end)
+                intervals[(start, end)] = interval
+            yield self._profile_interval(
+                interval, measures, single_day, drag_method
+            )
+
+    def _get_interval(self, tariff, start, end):
+        """Hours from start to end, both included, with their coefficients.
+
+        :return: dict with the UTC epoch 'hours', the coefficients of the
+                 tariff in 'cofs', the period of every hour in 'periods', the
+                 positions of the hours of every period in 'positions', the
+                 sum of the coefficients of every hour period in 'sums' and
+                 the day of the measure of every hour in 'days' or, if the
+                 measures are not of a single day, in 'first_days'
+        """
+        pos, end_pos = self.coefficient.get_range_positions(start, end)
+        hours = self.coefficient.hours[pos:end_pos]
+        cofs = self.coefficient.get_values(
+            None, tariff.cof, positions=np.arange(pos, end_pos)
+        )
+        instants = hours * 3600
+        # The period and the day of an hour are the ones of the minute before
+        walls = instants + get_utc_offsets(instants) - 60
+        periods = tariff.classify_arrays(
+            walls.astype('datetime64[s]'), instants - 60
+        )
+        # The sums of the coefficients of every period as get_coefs_by_tariff
+        sum_cofs = dict.fromkeys(tariff.energy_periods.keys(), 0)
+        if len(sum_cofs) > 1:
+            for code in set(periods.tolist()):
+                if code not in sum_cofs:
+                    raise KeyError(code)
+                sum_cofs[code] += sum(cofs[periods == code].tolist())
+        elif len(hours):
+            sum_cofs[list(sum_cofs.keys())[0]] += sum(cofs.tolist())
+        # The measure of every hour is the first one of its period at or
+        # after its day
+        days = walls // 86400 + EPOCH.toordinal()
+        # To take the first measure
+        first_days = days + (days == start.toordinal())
+        positions = {}
+        sums = np.empty(len(hours), dtype=object)
+        for code in set(periods.tolist()):
+            positions[code] = np.flatnonzero(periods == code)
+            sums[positions[code]] = sum_cofs[code]
+        return {
+            'hours': hours,
+            'cofs': cofs,
+            'periods': periods.tolist(),
+            'positions': positions,
+            'sums': sums.tolist(),
+            'days': days,
+            'first_days': first_days
+        }
+
+    def _profile_interval(self, interval, measures, single_day, drag_method):
+        """Profile the hours of an interval of _get_interval.
+
+        :return: (UTC epoch hours, dict with a list for every key of the rows)
+        """
+        hours = interval['hours']
+        if single_day:
+            days = interval['days']
+        else:
+            days = interval['first_days']
+        consumptions = np.empty(len(hours), dtype=object)
+        consumption_dates = np.empty(len(hours), dtype=object)
+        for code, positions in interval['positions'].items():
+            period_measures = measures.get(code, [])
+            measure_days = np.array(
+                [m.date.toordinal() for m in period_measures], dtype=np.int64
+            )
+            found = np.searchsorted(measure_days, days[positions], side='left')
+            consumptions[positions] = np.array(
+                [m.consumption for m in period_measures] + [0], dtype=object
+            )[found]
+            consumption_dates[positions] = np.array(
+                [m.date for m in period_measures] + [None], dtype=object
+            )[found]
+        consumptions = consumptions.tolist()
+        sums = interval['sums']
+        cofs = interval['cofs']
+        shares = to_column(consumptions)
+        if shares.dtype != object and all(sums):
+            shares = (shares * cofs / np.array(sums, dtype=np.float64)).tolist()
+            cofs = cofs.tolist()
+        else:
+            cofs = cofs.tolist()
+            shares = [
+                (consumption * cof) / sum_cof
+                for consumption, cof, sum_cof in zip(consumptions, cofs, sums)
+            ]
+        periods = interval['periods']
+        if drag_method == 'hour':
+            keys = 'hour'
+        else:
+            keys = periods
+        aprox, drags = Dragger().drag_many(shares, keys)
+        return hours, {
+            'aprox': aprox,
+            'drag': drags,
+            'consumption': consumptions,
+            'consumption_date': consumption_dates.tolist(),
+            'sum_cofs': list(sums),
+            'cof': cofs,
+            'period': list(periods)
+        }
+
+
+def iter_lines(chunks, decompressor=None):
+    """Lines of a stream of chunks, decompressed as they are read.
+
+    :param chunks: iterable of bytes
+    :param decompressor: object with the decompress method of zlib and bz2
+    :return: generator of the lines as bytes, without the line break
+    """
+    pending = b''
+    for chunk in chunks:
+        if decompressor is not None:
+            chunk = decompressor.decompress(chunk)
+        lines = (pending + chunk).split(b'\n')
+        pending = lines.pop()
+        for line in lines:
+            yield line
+    if hasattr(decompressor, 'flush'):
+        pending += decompressor.flush()
+    for line in pending.split(b'\n'):
+        yield line
+
+
+def parse_perff(lines, year, month):
+    """Coefficients of the lines of a PERFF file of REE.
+
+    Every row has the year, month, day, hour and DST flag and then the
+    coefficients. The hours of a day are numbered from 1, so the hour n is n
+    hours after the midnight of the day.
+
+    :param lines: iterable of the lines of the file, header included
+    :return: Coefficients
+    """
+    names = get_tariff_coeffs_list(year, month)
+    n_values = 5 + len(names)
+    hours = []
+    rows = []
+    lines = iter(lines)
+    # Header
+    next(lines, None)
+    for line in lines:
+        vals = line.split(b';')
+        if len(vals) < n_values:
+            if line.strip():
+                raise ValueError('Invalid PERFF row: {0!r}'.format(line))
+            continue
+        if int(vals[3]) == 1:
+            midnight = TIMEZONE.localize(
+                datetime(int(vals[0]), int(vals[1]), int(vals[2]))
+            )
+            hour = to_epoch_seconds(midnight) // 3600
+        hour += 1
+        hours.append(hour)
+        rows.append(vals[5:n_values])
+    values = np.array(rows, dtype=np.float64).reshape(len(rows), len(names))
+    return Coefficients.from_columns(hours, dict(
+        (name, values[:, idx].copy()) for idx, name in enumerate(names)
+    ))
 
 
 class REEProfile(object):
@@ -219,23 +745,139 @@ class REEProfile(object):
     GISCE_URL = 'https://github.com/gisce/ree_monthly_profiles/blob/main/perff/'
     down_lock = Lock()
 
-    _CACHE = {}
+    # Last months used by the process
+    _CACHE = LRUCache(maxsize=240)
+    # Months downloaded, shared by all the processes
+    disk_cache = None
+    if os.environ.get('ENERDATA_CACHE_DIR'):
+        disk_cache = DiskCache(
+            os.path.join(os.environ['ENERDATA_CACHE_DIR'], 'ree_profiles'),
+            suffix='.npz'
+        )
+
+    # Months downloaded at the same time by get_range
+    max_workers = 4
+    # Bytes read at once from the downloads
+    chunk_size = 64 * 1024
+    # Class of the connections to HOST, httplib.HTTPSConnection by default
+    connection_class = None
+    # Connections of every thread, reused between downloads
+    _local = threading.local()
+    # Locks of the months being got, consecutive months use different ones
+    _locks = [threading.Lock() for _ in range(32)]
 
     @classmethod
     def get_range(cls, start, end):
-        cofs = []
+        months = []
         start = datetime(start.year, start.month, 1)
         end = datetime(end.year, end.month, 1)
         while start <= end:
+            months.append((start.year, start.month))
+            start += relativedelta(months=1)
+        fetched = {}
+        missing = [
+            (year, month) for year, month in months
+            if '%(year)s%(month)02i' % locals() not in cls._CACHE
+        ]
+        if len(missing) > 1 and cls.max_workers > 1:
+            logger.debug('Downloading {0} months of coefficients'.format(
+                len(missing)
+            ))
+            pool = ThreadPool(min(cls.max_workers, len(missing)))
+            try:
+                fetched = dict(zip(missing, pool.map(
+                    lambda year_month: REEProfile.get(*year_month), missing
+                )))
+            finally:
+                pool.close()
+                pool.join()
+        cofs = []
+        for year, month in months:
             logger.debug('Downloading coefficients for {0}/{1}'.format(
-                start.month, start.year
+                month, year
             ))
-            cofs.extend(REEProfile.get(start.year, start.month))
-            start += relativedelta(months=1)
+            if (year, month) in fetched:
+                cofs.extend(fetched[(year, month)])
+            else:
+                cofs.extend(REEProfile.get(year, month))
         return cofs
 
+    @classmethod
+    def _get_lock(cls, year, month):
+        return cls._locks[(year * 12 + month) % len(cls._locks)]
+
     @classmethod
     def get(cls, year, month):
+        key = '%(year)s%(month)02i' % locals()
+        # Different months are downloaded at the same time
+        with cls._get_lock(year, month):
+            cofs = cls._CACHE.get(key)
+            if cofs is not None:
+                logger.debug('Using CACHE for REEProfile {0}'.format(key))
+                return cofs
+            disk_cache = cls.disk_cache
+            if disk_cache is None:
+                cofs = cls.download(year, month)
+            else:
+                cofs = cls._get_from_disk(disk_cache, key)
+                if cofs is None:
+                    # Only one process downloads the month
+                    with disk_cache.lock(key):
+                        cofs = cls._get_from_disk(disk_cache, key)
+                        if cofs is None:
+                            cofs = cls.download(year, month)
+                            disk_cache[key] = Coefficients(cofs).dumps()
+            cls._CACHE[key] = cofs
+            return cofs
+
+    @classmethod
+    def _request(cls, path):
+        """GET a path of HOST with the connection of the thread.
+
+        The connection is kept open for the next requests of the thread, and
+        opened again once if the server closed it.
+        """
+        for retry in (True, False):
+            conn = getattr(cls._local, 'connection', None)
+            if conn is None:
+                conn = (cls.connection_class or httplib.HTTPSConnection)(
+                    cls.HOST
+                )
+                cls._local.connection = conn
+            try:
+                conn.request('GET', path)
+                return conn.getresponse()
+            except (httplib.HTTPException, socket.error):
+                conn.close()
+                cls._local.connection = None
+                if not retry:
+                    raise
+
+    @classmethod
+    def _get_session(cls):
+        session = getattr(cls._local, 'session', None)
+        if session is None:
+            session = requests.Session()
+            cls._local.session = session
+        return session
+
+    @classmethod
+    def _get_from_disk(cls, disk_cache, key):
+        data = disk_cache.get(key)
+        if data is None:
+            return None
+        try:
+            cofs = list(Coefficients.loads(data).coefs)
+        except Exception as e:
+            logger.warning('Invalid REEProfile {0} in the disk cache: {1}'.format(
+                key, e
+            ))
+            return None
+        logger.debug('Using disk cache for REEProfile {0}'.format(key))
+        return cofs
+
+    @classmethod
+    def download(cls, year, month):
         try:
             import ssl
             try:
@@ -246,90 +888,30 @@ class REEProfile(object):
                 ssl._create_default_https_context = _create_unverified_https_context
         except ImportError:
             pass
-        conn = None
-        try:
-            cls.down_lock.acquire()
-
-            key = '%(year)s%(month)02i' % locals()
-            if key in cls._CACHE:
-                logger.debug('Using CACHE for REEProfile {0}'.format(key))
-                return cls._CACHE[key]
-            perff_file = 'PERFF_%(key)s.gz' % locals()
-            conn = httplib.HTTPSConnection(cls.HOST)
-            conn.request('GET', '%s/%s' % (cls.PATH, perff_file))
-            logger.debug('Downloading REEProfile from {0}/{1}'.format(
-                cls.PATH, perff_file
-            ))
-            r = conn.getresponse()
-            if r.getheader('Content-Type') == 'application/x-gzip':
-                content = r.read()
-                try:
-                    c = StringIO(content)
-                    m = StringIO(gzip.GzipFile(fileobj=c).read())
-                except:
-                    c = BytesIO(content)
-                    n = BytesIO(gzip.GzipFile(fileobj=c).read())
-                    content = n.read().decode('iso8859-15')
-                    m = StringIO(content)
-                c.close()
-                reader = csv.reader(m, delimiter=';')
-                header = True
-                cofs = []
-                coeffs_list = get_tariff_coeffs_list(year, month)
-                for vals in reader:
-                    if header:
-                        header = False
-                        continue
-                    if int(vals[3]) == 1:
-                        n_hour = 1
-                    dt = datetime(
-                        int(vals[0]), int(vals[1]), int(vals[2])
-                    )
-                    day = TIMEZONE.localize(dt, is_dst=bool(not int(vals[4])))
-                    day += timedelta(hours=n_hour)
-                    n_hour += 1
-                    cofs.append(Coefficent(
-                        TIMEZONE.normalize(day), dict(
-                            (k, float(vals[i])) for i, k in enumerate(coeffs_list, 5)
-                        ))
-                    )
-                cls._CACHE[key] = cofs
-                return cofs
-            else:
-                try:
-                    perff_file = 'PERFF_%(key)s.0.bz2' % locals()
-                    r = requests.get(cls.GISCE_URL + perff_file, params={'raw': 'true'})
-                    c = StringIO(r.content)
-                    m = StringIO(bz2.decompress(c.read()))
-                    reader = csv.reader(m, delimiter=';')
-                    header = True
-                    cofs = []
-                    coeffs_list = get_tariff_coeffs_list(year, month)
-                    for vals in reader:
-                        if header:
-                            header = False
-                            continue
-                        if int(vals[3]) == 1:
-                            n_hour = 1
-                        dt = datetime(
-                            int(vals[0]), int(vals[1]), int(vals[2])
-                        )
-                        day = TIMEZONE.localize(dt, is_dst=bool(not int(vals[4])))
-                        day += timedelta(hours=n_hour)
-                        n_hour += 1
-                        cofs.append(Coefficent(
-                            TIMEZONE.normalize(day), dict(
-                                (k, float(vals[i])) for i, k in enumerate(coeffs_list, 5)
-                            ))
-                        )
-                    cls._CACHE[key] = cofs
-                    return cofs
-                except:
-                    raise Exception('Profiles from REE not found')
-        finally:
-            if conn is not None:
-                conn.close()
-            cls.down_lock.release()
+        key = '%(year)s%(month)02i' % locals()
+        perff_file = 'PERFF_%(key)s.gz' % locals()
+        logger.debug('Downloading REEProfile from {0}/{1}'.format(
+            cls.PATH, perff_file
+        ))
+        r = cls._request('%s/%s' % (cls.PATH, perff_file))
+        if r.getheader('Content-Type') == 'application/x-gzip':
+            chunks = iter(lambda: r.read(cls.chunk_size), b'')
+            lines = iter_lines(chunks, zlib.decompressobj(16 + zlib.MAX_WBITS))
+            return list(parse_perff(lines, year, month).coefs)
+        else:
+            # Read all the response to reuse the connection
+            r.read()
+            try:
+                perff_file = 'PERFF_%(key)s.0.bz2' % locals()
+                r = cls._get_session().get(
+                    cls.GISCE_URL + perff_file, params={'raw': 'true'},
+                    stream=True
+                )
+                chunks = r.iter_content(cls.chunk_size)
+                lines = iter_lines(chunks, bz2.BZ2Decompressor())
+                return list(parse_perff(lines, year, month).coefs)
+            except:
+                raise Exception('Profiles from REE not found')
 
 
 class REProfile(object):
@@ -348,27 +930,93 @@ class REProfile(object):
         12: 'Diciembre'
     }
 
+    # Tables of the coefficients of every class, read once
+    _TABLES = {}
+
     @classmethod
-    def get_range(cls, start, end):
+    def get_table(cls):
+        """Coefficients by month and solar hour, read once by the process.
+
+        :return: float64 array with the coefficient of the solar hour h (1 to
+                 24) of the month m at [m, h]
+        """
+        table = REProfile._TABLES.get(cls)
+        if table is None:
+            table = cls.read_table()
+            REProfile._TABLES[cls] = table
+        return table
+
+    @classmethod
+    def read_table(cls):
         sheet_name = 'zona_{}'.format(cls.climatic_zone)
         filename = path.join(
             path.dirname(path.realpath(__file__)), 'data/coefficients_RE.xlsx'
         )
         df = pd.read_excel(filename, sheet_name=sheet_name)
         key = df.keys()[0]
-        cofs = []
-        while start <= end:
-            month = cls.translate_month[start.month]
-            solar_hour = convert_to_solar_hour(start)
-            if solar_hour.hour != 0:
-                hour = solar_hour.hour
-            else:
-                hour = 24
-            coff_value = float(df[df[key] == month][hour])
-            coff = Coefficent(start, {'A': coff_value})
-            cofs.append(coff)
-            start += relativedelta(hours=1)
-        return cofs
+        hours = list(range(1, 25))
+        table = np.full((13, 25), np.nan)
+        for month, name in cls.translate_month.items():
+            table[month, 1:] = df[df[key] == name][hours].values
+        return table
+
+    @classmethod
+    def get_values(cls, walls, instants):
+        """Coefficients of the hours with the given wall times and instants.
+
+        :param walls: datetime64 array of wall times
+        :param instants: int64 array of UTC epoch seconds
+        :return: float64 array
+        """
+        months = walls.astype('datetime64[M]').astype(np.int64) % 12 + 1
+        # The solar hour is the UTC hour, from 1 to 24
+        solar_hours = (instants // 3600 - 1) % 24 + 1
+        return cls.get_table()[months, solar_hours]
+
+    @classmethod
+    def get_coefficients(cls, start, end):
+        """Coefficients of the hours from start to end, as get_range."""
+        walls, instants = hourly_range(start, end)
+        if (instants % 3600).any():
+            raise ValueError('Coefficients must be hourly')
+        return Coefficients.from_columns(
+            instants // 3600, {'A': cls.get_values(walls, instants)}
+        )
+
+    @classmethod
+    def get_range(cls, start, end):
+        walls, instants = hourly_range(start, end)
+        values = cls.get_values(walls, instants).tolist()
+        return [
+            Coefficent(start + timedelta(hours=n), {'A': value})
+            for n, value in enumerate(values)
+        ]
+
+    @classmethod
+    def get_exported_energy_mask(cls, measures):
+        """
+        Mask of the ProfileHour with energy != 0 in hours with RE coefficient == 0
+        :param measures: A list of ProfileHour objects or ProfileMeasures
+        :return: A boolean numpy array, True for the invalid profiles
+        """
+        if isinstance(measures, ProfileMeasures):
+            instants = measures.hours * 3600
+            energy = measures.measure
+            start = from_epoch_hour(measures.hours.min())
+            end = from_epoch_hour(measures.hours.max())
+        else:
+            instants = walls_and_instants(m[0] for m in measures)[1]
+            energy = to_column([m[1] for m in measures])
+            start = min(measures).date
+            end = max(measures).date
+        # Join the measures with the hours of the coefficients
+        walls, hours = hourly_range(start, end)
+        values = cls.get_values(walls, hours)
+        positions, seconds = np.divmod(instants - hours[0], 3600)
+        found = (seconds == 0) & (positions >= 0) & (positions < len(hours))
+        invalid = np.asarray(energy != 0, dtype=bool) & found
+        invalid[found] &= values[positions[found]] == 0
+        return invalid
 
     @classmethod
     def validate_exported_energy(cls, measures):
@@ -378,30 +1026,11 @@ class REProfile(object):
         :return valid: A boolean that indicates if all the profiles in measures are valid
         :return invalid_profiles: A list containing the invalid profiles in measures
         """
-        # Check if measures list is valid
-        valid = True
-        # Save invalid profiles
-        invalid_profiles = []
-        # get and iterate RE coefficients
-        coefficients = cls.get_range(min(measures).date, max(measures).date)
-        # iterate all RE measures
-        for measure in measures:
-            # if energy value is not zero
-            if measure[1] != 0:
-                # fetch coeff by profile date
-                cof = False
-                for c in coefficients:
-                    if c.hour == measure[0]:
-                        cof = c
-                        break
-                if cof:
-                    # if coeff is zero
-                    if cof.cof['A'] == 0:
-                        # replace energy value by 'warning'
-                        invalid_profiles.append(measure)
-                        # mark measures as invalid
-                        valid = False
-        return valid, invalid_profiles
+        invalid = cls.get_exported_energy_mask(measures)
+        invalid_profiles = [
+            measures[idx] for idx in np.flatnonzero(invalid).tolist()
+        ]
+        return not invalid.any(), invalid_profiles
 
 
 class REProfileZone1(REProfile):
@@ -426,28 +1055,29 @@ class REProfileZone5(REProfile):
 
 class REProfileHydraulic(REProfile):
     @classmethod
-    def get_range(cls, start, end):
+    def read_table(cls):
         filename = path.join(path.dirname(path.realpath(__file__)), 'data/coefficients_HIDRO_RE.csv')
         df = pd.read_csv(filename)
-        cofs = []
-        while start <= end:
-            month = cls.translate_month[start.month]
-            coff_value = float(df[df['MES'] == month]['Factor de funcionamiento'])
-            coff = Coefficent(start, {'A': coff_value})
-            cofs.append(coff)
-            start += relativedelta(hours=1)
-        return cofs
+        table = np.full((13, 25), np.nan)
+        for month, name in cls.translate_month.items():
+            # The same factor for all the hours of the month
+            table[month, 1:] = df[df['MES'] == name][
+                'Factor de funcionamiento'
+            ].values
+        return table
+
+    @classmethod
+    def get_values(cls, walls, instants):
+        months = walls.astype('datetime64[M]').astype(np.int64) % 12 + 1
+        return cls.get_table()[months, 1]
 
 
 class REProfileFlat(REProfile):
     flat_cof = 0.85
+
     @classmethod
-    def get_range(cls, start, end):
-        cofs = []
-        while start <= end:
-            cofs.append(Coefficent(start, {'A': cls.flat_cof}))
-            start += relativedelta(hours=1)
-        return cofs
+    def get_values(cls, walls, instants):
+        return np.full(len(instants), cls.flat_cof, dtype=np.float64)
 
 
 class ProfileHour(namedtuple('ProfileHour', ['date', 'measure', 'valid', 'accumulated'])):
@@ -467,17 +1097,407 @@ class ProfileHour(namedtuple('ProfileHour', ['date', 'measure', 'valid', 'accumu
         return self.date >= other.date
 
 
+COLUMN_DTYPES = (
+    (np.bool_, (bool, )),
+    (np.int64, integer_types),
+    (np.float64, (float, )),
+)
+
+
+def get_column_dtype(values):
+    """Get the dtype to store the values without changing their types.
+
+    :return: numpy dtype, object if the values are of mixed types or None if
+             there are no values
+    """
+    types = set(type(v) for v in values)
+    if not types:
+        return None
+    for dtype, python_types in COLUMN_DTYPES:
+        if all(t in python_types for t in types):
+            return dtype
+    return object
+
+
+def to_column(values, dtype=None):
+    """Numpy array of values that are read back with the same types."""
+    if dtype is None:
+        dtype = get_column_dtype(values) or np.float64
+    try:
+        return np.array(values, dtype=dtype)
+    except OverflowError:
+        column = np.empty(len(values), dtype=object)
+        column[:] = values
+        return column
+
+
+def insert_column(column, positions, values):
+    """Insert values into a column as np.insert keeping their types."""
+    values = to_column(values)
+    if not len(values):
+        return column.copy()
+    if not len(column):
+        return values
+    if column.dtype != values.dtype:
+        column = column.astype(object)
+        values = values.astype(object)
+    return np.insert(column, positions, values)
+
+
+def _measures_column(name):
+    """Column of ProfileMeasures with the appended measures."""
+    attribute = '_' + name
+
+    def get(self):
+        self._flush()
+        return getattr(self, attribute)
+
+    def set(self, column):
+        self._flush()
+        setattr(self, attribute, column)
+
+    return property(get, set)
+
+
+class ProfileMeasures(MutableSequence):
+    """A list of ProfileHour stored by columns.
+
+    The dates are kept as UTC epoch hours and the measure, valid and
+    accumulated fields as numpy arrays. The ProfileHour tuples are built when
+    they are accessed. Only ProfileHour with normalized dates of TIMEZONE on
+    the hour can be stored, any other measure raises a TypeError.
+
+    It can be used as the list of measures it was before: the appended
+    measures are added to the columns when they are read, and sorting,
+    concatenating and assigning slices are supported.
+    """
+
+    columns = ('measure', 'valid', 'accumulated')
+
+    hours = _measures_column('hours')
+    measure = _measures_column('measure')
+    valid = _measures_column('valid')
+    accumulated = _measures_column('accumulated')
+
+    def __init__(self, measures=None):
+        self._pending = []
+        if measures is None:
+            measures = []
+        if isinstance(measures, ProfileMeasures):
+            self.hours = measures.hours.copy()
+            for column in self.columns:
+                setattr(self, column, getattr(measures, column).copy())
+            return
+        measures = list(measures)
+        for measure in measures:
+            if type(measure) is not ProfileHour:
+                raise TypeError('{0} is not a ProfileHour'.format(measure))
+        self.hours = to_epoch_hours(m.date for m in measures)
+        for idx, column in enumerate(self.columns, 1):
+            setattr(self, column, to_column([m[idx] for m in measures]))
+
+    @classmethod
+    def from_columns(cls, hours, measure, valid, accumulated):
+        measures = cls.__new__(cls)
+        measures._pending = []
+        measures.hours = np.asarray(hours, dtype=np.int64)
+        measures.measure = measure
+        measures.valid = valid
+        measures.accumulated = accumulated
+        return measures
+
+    def _flush(self):
+        """Add the appended measures to the columns."""
+        pending = self._pending
+        if not pending:
+            return
+        self._pending = []
+        position = len(self._hours)
+        self._hours = np.concatenate(
+            (self._hours, np.array([h for h, _ in pending], dtype=np.int64))
+        )
+        for idx, name in enumerate(self.columns, 1):
+            attribute = '_' + name
+            setattr(self, attribute, insert_column(
+                getattr(self, attribute), position,
+                [m[idx] for _, m in pending]
+            ))
+
+    @property
+    def dates(self):
+        return from_epoch_hours(self.hours)
+
+    @property
+    def valid_mask(self):
+        return self.valid.astype(bool)
+
+    def walls_and_instants(self):
+        """Wall times and UTC instants of the dates as walls_and_instants."""
+        instants = self.hours * 3600
+        walls = instants + get_utc_offsets(instants)
+        return walls.astype('datetime64[s]'), instants
+
+    def _get_index(self, index):
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError('ProfileMeasures index out of range')
+        return index
+
+    def _set_values(self, index, measure, insert=False):
+        if type(measure) is not ProfileHour:
+            raise TypeError('{0} is not a ProfileHour'.format(measure))
+        hour = to_epoch_hours([measure.date])[0]
+        if insert:
+            self.hours = np.insert(self.hours, index, hour)
+        else:
+            self.hours[index] = hour
+        for idx, name in enumerate(self.columns, 1):
+            column = getattr(self, name)
+            value = measure[idx]
+            if column.dtype != object:
+                dtype = get_column_dtype([value])
+                if not len(column):
+                    column = column.astype(dtype)
+                elif dtype != column.dtype:
+                    column = column.astype(object)
+            if insert:
+                slot = np.empty(1, dtype=column.dtype)
+                column = np.concatenate(
+                    (column[:index], slot, column[index:])
+                )
+            column[index] = value
+            setattr(self, name, column)
+
+    def _set_measures(self, measures):
+        """Replace all the measures by the given ProfileMeasures."""
+        self.hours = measures.hours
+        for column in self.columns:
+            setattr(self, column, getattr(measures, column))
+
+    def __len__(self):
+        return len(self._hours) + len(self._pending)
+
+    def __getitem__(self, index):
+        if isinstance(index, (slice, np.ndarray)):
+            # A copy as slicing a list, not a view of the columns
+            return self.from_columns(
+                self.hours[index].copy(),
+                *[getattr(self, column)[index].copy()
+                  for column in self.columns]
+            )
+        index = self._get_index(index)
+        return ProfileHour(
+            from_epoch_hours(self.hours[index:index + 1])[0],
+            *[getattr(self, column)[index:index + 1].tolist()[0]
+              for column in self.columns]
+        )
+
+    def __setitem__(self, index, measure):
+        if isinstance(index, slice):
+            measures = list(self)
+            measures[index] = measure
+            self._set_measures(ProfileMeasures(measures))
+            return
+        self._set_values(self._get_index(index), measure)
+
+    def __delitem__(self, index):
+        if not isinstance(index, (slice, np.ndarray)):
+            index = self._get_index(index)
+        self.hours = np.delete(self.hours, index)
+        for column in self.columns:
+            setattr(self, column, np.delete(getattr(self, column), index))
+
+    def insert(self, index, measure):
+        index = min(max(index + len(self) if index < 0 else index, 0), len(self))
+        if index == len(self):
+            self.append(measure)
+            return
+        self._set_values(index, measure, insert=True)
+
+    def append(self, measure):
+        if type(measure) is not ProfileHour:
+            raise TypeError('{0} is not a ProfileHour'.format(measure))
+        self._pending.append((to_epoch_hours([measure.date])[0], measure))
+
+    def copy(self):
+        return ProfileMeasures(self)
+
+    def sort(self, key=None, reverse=False):
+        """Sort the measures in place as list.sort does."""
+        if key is None and not reverse:
+            # ProfileHour are sorted by date
+            order = np.argsort(self.hours, kind='stable')
+            self._set_measures(self[order])
+            return
+        self._set_measures(
+            ProfileMeasures(sorted(self, key=key, reverse=reverse))
+        )
+
+    def __add__(self, other):
+        if isinstance(other, ProfileMeasures):
+            return self.from_columns(
+                np.concatenate((self.hours, other.hours)),
+                *[insert_column(
+                    getattr(self, column), len(self),
+                    getattr(other, column).tolist()
+                ) for column in self.columns]
+            )
+        if not isinstance(other, list):
+            return NotImplemented
+        return list(self) + other
+
+    def __radd__(self, other):
+        if not isinstance(other, list):
+            return NotImplemented
+        return other + list(self)
+
+    def __iter__(self):
+        rows = zip(
+            self.dates, *[getattr(self, c).tolist() for c in self.columns]
+        )
+        for row in rows:
+            yield ProfileHour(*row)
+
+    def __eq__(self, other):
+        if not isinstance(other, (list, ProfileMeasures)):
+            return NotImplemented
+        return list(self) == list(other)
+
+    def __ne__(self, other):
+        eq = self.__eq__(other)
+        if eq is NotImplemented:
+            return eq
+        return not eq
+
+    def __repr__(self):
+        return 'ProfileMeasures({0!r})'.format(list(self))
+
+
+class ProfileGaps(Sequence):
+    """The hours of a profile without a valid measure.
+
+    The gaps are kept as runs of consecutive hours, (offset, length) from the
+    start of the profile, and the datetimes are built when they are accessed
+    as `start + timedelta(hours=offset)`.
+
+    The gaps can not be changed as the list they were before, to_list gets a
+    list of them and adding them to a list gets a list.
+    """
+
+    def __init__(self, start, runs=None):
+        self.start = start
+        if runs is None:
+            runs = []
+        self.runs = np.asarray(runs, dtype=np.int64).reshape(-1, 2)
+        self._ends = np.cumsum(self.runs[:, 1])
+
+    @classmethod
+    def from_mask(cls, start, mask):
+        """Gaps from a boolean array of the hours, True for the gaps."""
+        mask = np.asarray(mask, dtype=np.int8)
+        edges = np.diff(np.concatenate(([0], mask, [0])))
+        starts = np.flatnonzero(edges == 1)
+        ends = np.flatnonzero(edges == -1)
+        return cls(start, np.column_stack((starts, ends - starts)))
+
+    @property
+    def indexes(self):
+        """Offsets in hours from the start of every gap."""
+        if not len(self.runs):
+            return np.zeros(0, dtype=np.int64)
+        starts, lengths = self.runs.T
+        return np.repeat(starts - self._ends + lengths, lengths) + np.arange(
+            self._ends[-1]
+        )
+
+    def __len__(self):
+        if not len(self.runs):
+            return 0
+        return int(self._ends[-1])
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[idx] for idx in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError('ProfileGaps index out of range')
+        run = np.searchsorted(self._ends, index, side='right')
+        start, length = self.runs[run].tolist()
+        offset = index + start - int(self._ends[run]) + length
+        return self.start + timedelta(hours=offset)
+
+    def __iter__(self):
+        for start, length in self.runs.tolist():
+            for offset in range(start, start + length):
+                yield self.start + timedelta(hours=offset)
+
+    def to_list(self):
+        """Get a list of the datetimes of the gaps."""
+        return list(self)
+
+    def __add__(self, other):
+        if isinstance(other, ProfileGaps):
+            other = other.to_list()
+        if not isinstance(other, list):
+            return NotImplemented
+        return self.to_list() + other
+
+    def __radd__(self, other):
+        if not isinstance(other, list):
+            return NotImplemented
+        return other + self.to_list()
+
+    def __contains__(self, dt):
+        try:
+            seconds = (dt - self.start).total_seconds()
+        except TypeError:
+            return False
+        if seconds % 3600:
+            return False
+        offset = int(seconds // 3600)
+        run = np.searchsorted(self.runs[:, 0], offset, side='right') - 1
+        if run < 0:
+            return False
+        start, length = self.runs[run].tolist()
+        return offset < start + length
+
+    def __eq__(self, other):
+        if not isinstance(other, (list, ProfileGaps)):
+            return NotImplemented
+        return list(self) == list(other)
+
+    def __ne__(self, other):
+        eq = self.__eq__(other)
+        if eq is NotImplemented:
+            return eq
+        return not eq
+
+    def __repr__(self):
+        return repr(list(self))
+
+
 class Profile(object):
     """A Profile object representing hours and consumption.
     """
 
     def __init__(self, start, end, measures, accumulated=None, drag_by_periods=True):
-        self.measures = measures[:]
-        self.gaps = []  # Containing the gaps and invalid measures
+        try:
+            self.measures = ProfileMeasures(measures)
+        except TypeError:
+            # Subclasses of ProfileHour and not normalized dates can not be
+            # stored by columns
+            self.measures = measures[:]
         self.adjusted_periods = [] # If a period is adjusted
         self.start_date = start
         self.end_date = end
         self.profile_class = REEProfile
+        # Period codes of the hours by tariff, see _get_span_periods
+        self._periods = {}
+        self._periods_span = (start, end)
+        # DragChain of the drags by name, to be reused, see _drag_chain
+        self._chains = None
 
         assert type(drag_by_periods) == bool, "drag_by_periods must be a Boolean"
         self.drag_by_periods = drag_by_periods
@@ -488,14 +1508,34 @@ class Profile(object):
             assert accumulated < 1 and accumulated > -1, "Provided accumulated '{}' must be -1 < accumulated < 1".format(accumulated)
             self.accumulated = accumulated
 
-        measures_by_date = dict(
-            [(m.date, m.measure) for m in measures if m.valid]
-        )
-        # End is included
-        while start <= end:
-            if measures_by_date.pop(TIMEZONE.normalize(start), None) is None:
-                self.gaps.append(start)
-            start += timedelta(hours=1)
+        # Containing the gaps and invalid measures
+        self.gaps = ProfileGaps.from_mask(start, self._get_gaps_mask())
+
+    def _get_gaps_mask(self):
+        """Boolean array of the hours from start to end, True for the hours
+        without a valid measure.
+        """
+        start = self.start_date
+        n_hours = hours_between(start, self.end_date)
+        if not isinstance(self.measures, ProfileMeasures):
+            measures_by_date = dict(
+                [(m.date, m.measure) for m in self.measures if m.valid]
+            )
+            mask = np.zeros(n_hours, dtype=bool)
+            for idx in range(n_hours):
+                if measures_by_date.pop(TIMEZONE.normalize(start), None) is None:
+                    mask[idx] = True
+                start += timedelta(hours=1)
+            return mask
+        valid = self.measures.valid_mask
+        if self.measures.measure.dtype == object:
+            valid &= self.measures.measure != None
+        offsets = self.measures.hours[valid] * 3600 - to_epoch_seconds(start)
+        offsets = offsets[offsets % 3600 == 0] // 3600
+        offsets = offsets[(offsets >= 0) & (offsets < n_hours)]
+        mask = np.ones(n_hours, dtype=bool)
+        mask[offsets] = False
+        return mask
 
     @property
     def n_hours(self):
@@ -508,15 +1548,29 @@ class Profile(object):
 
     @property
     def total_consumption(self):
-        return sum(x[1] for x in self.measures)
+        return sum(self._get_column('measure'))
 
     @property
     def first_day_of_month(self):
         return self.end_date.day == 1 and self.end_date.hour > 0
 
+    def _get_column(self, name, valid=False):
+        """Get the values of a field of the measures as a list."""
+        if isinstance(self.measures, ProfileMeasures):
+            measures = self.measures
+            if valid:
+                measures = measures[measures.valid_mask]
+            return getattr(measures, name).tolist()
+        return [getattr(m, name) for m in self.measures if not valid or m.valid]
+
     @staticmethod
     def simple_dragger(measures):
         dragger = Dragger()
+        if isinstance(measures, ProfileMeasures):
+            measures.measure = to_column(
+                dragger.drag_many(measures.measure.tolist())[0]
+            )
+            return measures
         for idx, measure in enumerate(measures):
             values = measure._asdict()
             consumption = dragger.drag(measure.measure)
@@ -524,35 +1578,110 @@ class Profile(object):
             measures[idx] = measure._replace(**values)
         return measures
 
+    def _get_periods(self, tariff, dates):
+        """Get the period codes of the hours ending at the given dates."""
+        return tariff.classify([d - timedelta(minutes=1) for d in dates])
+
+    def _get_periods_cache(self):
+        """Get the cached period codes, emptied when the start or the end of
+        the profile change."""
+        span = (self.start_date, self.end_date)
+        if self._periods_span != span:
+            self._periods_span = span
+            self._periods = {}
+        return self._periods
+
+    def _get_span_periods(self, tariff, normalized=False):
+        """Get the cached period codes of every hour from start to end.
+
+        :param normalized: False for the hours as `start + timedelta(hours=n)`,
+                           as the gaps are, True for the UTC hours from start,
+                           with the normalized dates of the measures
+        :return: numpy array of period codes
+        """
+        periods_cache = self._get_periods_cache()
+        key = (
+            normalized, type(tariff), tariff.code,
+            getattr(tariff, 'geom_zone', None)
+        )
+        periods = periods_cache.get(key)
+        if periods is not None:
+            return periods
+        if normalized:
+            periods = self._classify_hours(tariff, np.arange(
+                to_epoch_seconds(self.start_date) // 3600,
+                to_epoch_seconds(self.end_date) // 3600 + 1,
+                dtype=np.int64
+            ))
+        else:
+            periods = tariff.get_periods_for_range(
+                self.start_date - timedelta(minutes=1),
+                self.end_date - timedelta(minutes=1)
+            )
+        periods_cache[key] = periods
+        return periods
+
+    def _get_measures_periods(self, tariff, valid=False):
+        """Get the period codes of the hours of the measures."""
+        measures = self.measures
+        if not isinstance(measures, ProfileMeasures):
+            return self._get_periods(
+                tariff, [m.date for m in measures if not valid or m.valid]
+            )
+        if valid:
+            measures = measures[measures.valid_mask]
+        periods = self._get_span_periods(tariff, normalized=True)
+        positions = measures.hours - to_epoch_seconds(self.start_date) // 3600
+        inside = (positions >= 0) & (positions < len(periods))
+        if inside.all():
+            return periods[positions]
+        # Measures out of the profile are classified every time
+        codes = np.empty(len(positions), dtype=object)
+        codes[inside] = periods[positions[inside]]
+        codes[~inside] = self._classify_hours(tariff, measures.hours[~inside])
+        return codes
+
+    @staticmethod
+    def _classify_hours(tariff, hours):
+        """Get the period codes of the hours ending at the given UTC epoch
+        hours."""
+        instants = np.asarray(hours, dtype=np.int64) * 3600
+        walls = instants + get_utc_offsets(instants)
+        return tariff.classify_arrays(
+            walls.astype('datetime64[s]') - np.timedelta64(1, 'm'),
+            instants - 60
+        )
+
+    def _get_gaps_periods(self, tariff):
+        """Get the period codes of the hours of the gaps."""
+        return self._get_span_periods(tariff)[self.gaps.indexes]
+
     def get_hours_per_period(self, tariff, only_valid=False):
         assert isinstance(tariff, Tariff)
-        hours_per_period = Counter()
         if only_valid:
-            for m in self.measures:
-                if m.valid:
-                    dt = m.date - timedelta(minutes=1)
-                    period = tariff.get_period_by_date(dt)
-                    hours_per_period[period.code] += 1
+            periods = self._get_measures_periods(tariff, valid=True)
         else:
-            start_idx = self.start_date
-            end = self.end_date
-            while start_idx <= end:
-                dt = start_idx - timedelta(minutes=1)
-                period = tariff.get_period_by_date(dt)
-                hours_per_period[period.code] += 1
-                start_idx += timedelta(hours=1)
-        return hours_per_period
+            periods = self._get_span_periods(tariff)
+        return Counter(periods)
 
     def get_consumption_per_period(self, tariff):
         assert isinstance(tariff, Tariff)
+        measures = self._get_column('measure', valid=True)
+        periods = self._get_measures_periods(tariff, valid=True)
+        return self._sum_per_period(tariff, periods, measures)
+
+    @staticmethod
+    def _sum_per_period(tariff, periods, measures):
+        """Sum the measures of every energy period of the tariff.
+
+        :param periods: period code of every measure
+        :return: Counter with the consumption of every period
+        """
         consumption_per_period = Counter()
         for period in tariff.energy_periods:
             consumption_per_period[period] = 0
-        for m in self.measures:
-            if m.valid:
-                dt = m.date - timedelta(minutes=1)
-                period = tariff.get_period_by_date(dt)
-                consumption_per_period[period.code] += m.measure
+        for period, measure in zip(periods, measures):
+            consumption_per_period[period] += measure
         return consumption_per_period
 
     def get_estimable_hours(self, tariff):
@@ -576,6 +1705,42 @@ class Profile(object):
         assert isinstance(tariff, Tariff)
         logger.debug('Estimating for tariff: {0}'.format(tariff.code))
 
+        balance = self._adapt_balance(tariff, balance)
+        cofs = self._get_estimate_coefficients()
+
+        gaps_periods = self._get_gaps_periods(tariff)
+        period_cofs, gaps_cofs = self._get_gaps_cofs(tariff, cofs)
+
+        cofs_per_period = Counter()
+        for period in set(gaps_periods.tolist()):
+            cofs_per_period[period] = sum(
+                period_cofs[gaps_periods == period].tolist()
+            )
+
+        logger.debug('Coefficients per period calculated: {0}'.format(cofs_per_period))
+
+        energy_per_period = self.get_estimable_consumption(tariff, balance)
+
+        gaps_energy = self._get_gaps_energy(
+            gaps_periods, gaps_cofs, energy_per_period, cofs_per_period
+        )
+        gaps_measures, gaps_accumulated = self._drag_gaps(
+            gaps_periods, gaps_energy
+        )
+        if len(self.gaps) > 0:
+            logger.debug('Estimated {0} gaps: {1} kWh'.format(
+                len(self.gaps), sum(gaps_measures)
+            ))
+
+        measures = self._merge_gaps(gaps_measures, gaps_accumulated)
+        profile = Profile(self.start_date, self.end_date, measures)
+        profile._periods = self._get_periods_cache()
+        profile._chains = self._chains
+        return profile
+
+    @staticmethod
+    def _adapt_balance(tariff, balance):
+        """Adapt the balance of the tariffs estimated with other periods."""
         # Adapt balance for simplified T30A with just one period
         if isinstance(tariff, T30A_one_period) or isinstance(tariff, T31A_one_period):
             balance = {"P1": sum([values for values in balance.values()])}
@@ -583,105 +1748,254 @@ class Profile(object):
         if isinstance(tariff, T31A) and balance.get('P4', 0) > 0:
             balance['P1'] += balance['P4']
             balance['P4'] = 0
+        return balance
 
-        measures = [x for x in self.measures if x.valid]
-        start = self.start_date
-        end = self.end_date
+    def _get_estimate_range(self, start=None, end=None):
+        """Get the range of the coefficients of the profile class to estimate
+        the hours from start to end, by default the whole profile.
+
+        :return: (first date, last date) of the coefficients
+        """
+        start = start or self.start_date
+        end = end or self.end_date
         # - REE cofs get from (year/month)
         # - Simel cofs get from (year/month/day hour) - can't substract one day
         if self.first_day_of_month or not issubclass(self.profile_class, REEProfile):
-            cofs = self.profile_class.get_range(start, end)
+            range_end = self.end_date
         else:
-            cofs = self.profile_class.get_range(start, end - relativedelta(days=1))
-        cofs = Coefficients(cofs)
-        cofs_per_period = Counter()
+            range_end = self.end_date - relativedelta(days=1)
+        if not self._has_month_coefficients():
+            return start, min(end, range_end)
+        # Only the months of the hours ending from start to end, the hours
+        # ending at 00:00 of the first day are of the previous month
+        if start.tzinfo is not None:
+            start = TIMEZONE.normalize(start)
+            end = TIMEZONE.normalize(end)
+        first = max(start - timedelta(minutes=1), self.start_date)
+        last = max(min(end - timedelta(minutes=1), range_end), first)
+        return first, last
+
+    def _has_month_coefficients(self):
+        """Whether the profile class gets the coefficients by whole months,
+        as REEProfile.get_range does."""
+        return (
+            issubclass(self.profile_class, REEProfile)
+            and not hasattr(self.profile_class, 'get_coefficients')
+        )
 
-        for gap in self.gaps:
-            dt = gap - timedelta(minutes=1)
-            period = tariff.get_period_by_date(dt)
-            gap_cof = cofs.get(dt)
-            cofs_per_period[period.code] += gap_cof.cof[tariff.cof]
+    def _get_estimate_coefficients(self, start=None, end=None):
+        """Get the coefficients of the profile class to estimate the hours
+        from start to end, by default the whole profile."""
+        first, last = self._get_estimate_range(start, end)
+        if hasattr(self.profile_class, 'get_coefficients'):
+            return self.profile_class.get_coefficients(first, last)
+        return Coefficients(self.profile_class.get_range(first, last))
 
-        logger.debug('Coefficients per period calculated: {0}'.format(cofs_per_period))
+    def _get_gaps_cofs(self, tariff, cofs):
+        """Get the coefficients of the gaps.
 
-        energy_per_period = self.get_estimable_consumption(tariff, balance)
-        energy_per_period_rem = energy_per_period.copy()
+        :return: (array of the coefficients of the hours ending at the gaps,
+                 array of the coefficients of the gaps)
+        """
+        gaps_instants = (
+            to_epoch_seconds(self.start_date) + self.gaps.indexes * 3600
+        )
+        # The coefficients of the hours ending at the gaps and of the gaps
+        gaps_cofs = cofs.get_values(
+            np.concatenate((gaps_instants - 60, gaps_instants)), tariff.cof
+        )
+        return gaps_cofs[:len(gaps_instants)], gaps_cofs[len(gaps_instants):]
 
-        dragger = Dragger()
+    @staticmethod
+    def _get_gaps_energy(gaps_periods, gaps_cofs, energy_per_period,
+                         cofs_per_period):
+        """Get the energy of every gap, proportional to its coefficient.
 
-        # Initialize the Dragger with passed accumulated value
-        if len(self.gaps) > 0:
-            # Drag by_hours
-            if not self.drag_by_periods:
-                init_drag_key = "default"
+        :param energy_per_period: energy to estimate of every period
+        :param cofs_per_period: sum of the coefficients of every period
+        :return: list with the energy of every gap
+        """
+        gaps_energy = [0] * len(gaps_periods)
+        for period in set(gaps_periods.tolist()):
+            in_period = np.flatnonzero(gaps_periods == period)
+            energy = energy_per_period[period]
+            # If the balance[period] < energy_profile[period] fill with 0
+            if energy < 0:
+                energy = 0
+            if not cofs_per_period[period]:
+                logger.debug('No coefficients for period {0}'.format(period))
+                continue
+            if isinstance(energy, (integer_types, float)):
+                energies = (
+                    energy * gaps_cofs[in_period] / cofs_per_period[period]
+                ).tolist()
             else:
-                dt = self.gaps[0] - timedelta(minutes=1)
-                init_drag_key = tariff.get_period_by_date(dt).code
-
-            dragger.drag(self.accumulated, key=init_drag_key)
-
-            for idx, gap in enumerate(self.gaps):
-                logger.debug('Gap {0}/{1}'.format(idx + 1, len(self.gaps)))
-                dt = gap - timedelta(minutes=1)
-                period = tariff.get_period_by_date(dt)
-
-                drag_key = period.code if self.drag_by_periods else "default"
-
-                gap_cof = cofs.get(gap).cof[tariff.cof]
-                energy = energy_per_period[period.code]
-                # If the balance[period] < energy_profile[period] fill with 0
-                if energy < 0:
-                    energy = 0
-
-                try:
-                    gap_energy = (energy * gap_cof) / cofs_per_period[period.code]
-                except ZeroDivisionError as error:
-                    gap_energy = 0
-                    logger.debug(error)
-
-                aprox = dragger.drag(gap_energy, key=drag_key)
-                energy_per_period_rem[period.code] -= gap_energy
-
-                logger.debug(
-                    'Energy for hour {0} is {1}. {2} Energy {3}/{4}'.format(
-                        gap, aprox, period.code,
-                        energy_per_period_rem[period.code], energy
-                ))
-                pos = bisect.bisect_left(measures, ProfileHour(gap, 0, True, 0.0))
-                profile_hour = ProfileHour(TIMEZONE.normalize(gap), aprox, True, dragger[drag_key])
+                energies = [
+                    (energy * gaps_cofs[idx]) / cofs_per_period[period]
+                    for idx in in_period
+                ]
+            for idx, gap_energy in zip(in_period.tolist(), energies):
+                gaps_energy[idx] = gap_energy
+        return gaps_energy
+
+    def _drag_chain(self, dragger, name, numbers, key='default'):
+        """Drag the numbers with Dragger.drag_chain.
+
+        A profile that keeps its chains (IncrementalProfile) reuses the chain
+        of the same name of the previous drag.
+        """
+        if self._chains is None:
+            return dragger.drag_chain(numbers, key)
+        chain = dragger.drag_chain(numbers, key, self._chains.get(name))
+        self._chains[name] = chain
+        return chain
 
-                measures.insert(pos, profile_hour)
+    def _drag_gaps(self, gaps_periods, gaps_energy):
+        """Drag the energy of the gaps by period or all of them together.
 
-        profile = Profile(self.start_date, self.end_date, measures)
+        :return: (list of the measures, list of the drag after every gap)
+        """
+        if not len(self.gaps):
+            return [], []
+        if self.drag_by_periods:
+            keys = gaps_periods
+        else:
+            keys = np.full(len(gaps_periods), 'default', dtype=object)
+        dragger = Dragger()
+        # Initialize the Dragger with passed accumulated value
+        dragger.drag(self.accumulated, key=keys[0])
+
+        gaps_measures = [0] * len(keys)
+        gaps_accumulated = [0] * len(keys)
+        for key in set(keys.tolist()):
+            positions = np.flatnonzero(keys == key).tolist()
+            chain = self._drag_chain(
+                dragger, ('gaps', key),
+                [gaps_energy[idx] for idx in positions], key
+            )
+            for idx, measure, drag in zip(positions, chain.aprox, chain.drags):
+                gaps_measures[idx] = measure
+                gaps_accumulated[idx] = drag
+        return gaps_measures, gaps_accumulated
+
+    def _merge_gaps(self, gaps_measures, gaps_accumulated):
+        """Merge the valid measures with the estimated measures of the gaps.
+
+        :return: ProfileMeasures or list of the measures sorted by date
+        """
+        gaps = self.gaps
+        measures = self.measures
+        if isinstance(measures, ProfileMeasures):
+            measures = measures[measures.valid_mask]
+            hours = measures.hours
+            start = to_epoch_seconds(self.start_date)
+            if not start % 3600 and (np.diff(hours) >= 0).all():
+                gaps_hours = start // 3600 + gaps.indexes
+                positions = np.searchsorted(hours, gaps_hours, side='left')
+                return ProfileMeasures.from_columns(
+                    np.insert(hours, positions, gaps_hours),
+                    insert_column(measures.measure, positions, gaps_measures),
+                    insert_column(
+                        measures.valid, positions, [True] * len(gaps)
+                    ),
+                    insert_column(
+                        measures.accumulated, positions, gaps_accumulated
+                    )
+                )
+            measures = list(measures)
+        else:
+            measures = [x for x in measures if x.valid]
+
+        gaps_measures = [
+            ProfileHour(TIMEZONE.normalize(gap), measure, True, accumulated)
+            for gap, measure, accumulated in zip(
+                gaps, gaps_measures, gaps_accumulated
+            )
+        ]
+        if any(a > b for a, b in zip(measures, measures[1:])):
+            # Unsorted measures keep the positions of inserting one by one
+            for measure in gaps_measures:
+                measures.insert(bisect.bisect_left(measures, measure), measure)
+            return measures
+        positions = [
+            bisect.bisect_left(measures, measure) for measure in gaps_measures
+        ]
+        merged = []
+        last = 0
+        for position, measure in zip(positions, gaps_measures):
+            merged.extend(measures[last:position])
+            merged.append(measure)
+            last = position
+        merged.extend(measures[last:])
+        return merged
+
+    def _copy(self):
+        """Profile(start_date, end_date, measures) of a profile without gaps.
+
+        The copy gets no gaps instead of looking for them again.
+        """
+        profile = Profile.__new__(Profile)
+        try:
+            profile.measures = ProfileMeasures(self.measures)
+        except TypeError:
+            profile.measures = self.measures[:]
+        profile.adjusted_periods = []
+        profile.start_date = self.start_date
+        profile.end_date = self.end_date
+        profile.profile_class = REEProfile
+        profile.drag_by_periods = True
+        profile.accumulated = Decimal(0)
+        profile.gaps = ProfileGaps(self.start_date)
+        profile._periods = self._get_periods_cache()
+        profile._periods_span = (self.start_date, self.end_date)
+        profile._chains = self._chains
         return profile
 
     def adjust(self, tariff, balance, diff=0):
         # Adjust values
         if self.gaps:
             raise Exception('Is not possible to adjust a profile with gaps')
-        profile = Profile(self.start_date, self.end_date, self.measures)
-        dragger = Dragger()
-        energy_per_period = profile.get_consumption_per_period(tariff)
+        profile = self._copy()
+        # Classify the hours once, the consumption and the hours to adjust of
+        # every period come from it
+        periods = profile._get_measures_periods(tariff)
+        measures = profile._get_column('measure')
+        valid = [bool(v) for v in profile._get_column('valid')]
+        energy_per_period = self._sum_per_period(
+            tariff, periods[np.array(valid, dtype=bool)],
+            [measure for measure, v in zip(measures, valid) if v]
+        )
+        adjusted = []
+        values = []
         for period_name, period_balance in balance.items():
             period_profile = energy_per_period[period_name]
             margin_bottom = period_balance - diff
             margin_top = period_balance + diff
-            if not margin_bottom <= period_profile <= margin_top:
-                profile.adjusted_periods.append(period_name)
-                for idx, measure in enumerate(profile.measures):
-                    dt = measure.date - timedelta(minutes=1)
-                    period = tariff.get_period_by_date(dt).code
-                    if period != period_name:
-                        continue
-                    values = measure._asdict()
-                    values['valid'] = True
-                    if not energy_per_period[period]:
-                        values['measure'] = dragger.drag(measure.measure * 0)
-                    else:
-                        values['measure'] = dragger.drag(measure.measure * (
-                            balance[period] / energy_per_period[period]
-                        ))
-                    profile.measures[idx] = measure._replace(**values)
+            if margin_bottom <= period_profile <= margin_top:
+                continue
+            profile.adjusted_periods.append(period_name)
+            positions = np.flatnonzero(periods == period_name).tolist()
+            if not energy_per_period[period_name]:
+                values.extend(measures[idx] * 0 for idx in positions)
+            else:
+                factor = balance[period_name] / energy_per_period[period_name]
+                values.extend(measures[idx] * factor for idx in positions)
+            adjusted.extend(positions)
+        # The periods are dragged one after the other with the same key
+        chain = profile._drag_chain(Dragger(), ('adjust', ), values)
+        for idx, value in zip(adjusted, chain.aprox):
+            measures[idx] = value
+        if isinstance(profile.measures, ProfileMeasures):
+            valid = profile.measures.valid.tolist()
+            for idx in adjusted:
+                valid[idx] = True
+            profile.measures.measure = to_column(measures)
+            profile.measures.valid = to_column(valid)
+        else:
+            for idx in adjusted:
+                profile.measures[idx] = profile.measures[idx]._replace(
+                    measure=measures[idx], valid=True
+                )
         return profile
 
     def fixit(self, tariff, balance, diff=0):
@@ -693,10 +2007,202 @@ class Profile(object):
         if hasattr(tariff, 'low_voltage_measure') and getattr(tariff, 'low_voltage_measure'):
             # Apply losses on new 6.XTD flag_low and old 3.1A LB
             profile.measures = tariff.apply_curve_losses(profile.measures)
-            profile.measures = self.simple_dragger(profile.measures)
+            profile.measures = profile._drag_measures(profile.measures)
         return profile
 
+    def _drag_measures(self, measures):
+        """simple_dragger of the measures reusing the previous chain."""
+        if not isinstance(measures, ProfileMeasures):
+            return self.simple_dragger(measures)
+        chain = self._drag_chain(
+            Dragger(), ('measures', ), measures.measure.tolist()
+        )
+        measures.measure = to_column(chain.aprox)
+        return measures
+
     def __repr__(self):
         return '<Profile ({0} - {1}) {2}h {3}kWh>'.format(
             self.start_date, self.end_date, self.n_hours, self.total_consumption
         )
+
+
+class IncrementalProfile(Profile):
+    """A Profile of a tariff that gets its hourly measures as they arrive.
+
+    The measures are added with append and upsert, which keep the gaps and
+    the valid hours and consumption of every period of the tariff up to date
+    without looking at the other measures. The measures and the gaps are
+    built again only when they are read after a change, so the profile can
+    be estimated, adjusted or fixed at any time. The start and the end of
+    the profile can not be changed.
+
+    The consumption_per_period of float measures is a running total that
+    can differ from get_consumption_per_period by the rounding of the floats
+    until the measures are read, when it is summed again as
+    get_consumption_per_period does.
+
+    The drags of every estimate, adjust and fixit are kept, and the next ones
+    only drag again the numbers that changed, see Dragger.drag_chain. Only
+    the drags are reused, the rest of the estimation is done again over the
+    whole profile.
+
+    Only ProfileHour with normalized dates of TIMEZONE on the hour can be
+    added, any other measure raises a TypeError.
+    """
+
+    def __init__(self, start, end, tariff, measures=None, accumulated=None,
+                 drag_by_periods=True):
+        assert isinstance(tariff, Tariff)
+        if measures is None:
+            measures = []
+        self.tariff = tariff
+        self.start_date = start
+        self.end_date = end
+        self._periods = {}
+        self._periods_span = (start, end)
+        self._start = to_epoch_seconds(start)
+        self._n_hours = hours_between(start, end)
+        super(IncrementalProfile, self).__init__(
+            start, end, measures, accumulated, drag_by_periods
+        )
+        self._chains = {}
+
+    @property
+    def measures(self):
+        """ProfileMeasures of the measures sorted by date."""
+        if self._measures is None:
+            hours = sorted(self._readings)
+            readings = [self._readings[hour] for hour in hours]
+            self._measures = ProfileMeasures.from_columns(hours, *[
+                to_column([reading[idx] for reading in readings])
+                for idx in range(1, len(ProfileHour._fields))
+            ])
+            self._sum_consumption()
+        return self._measures
+
+    @measures.setter
+    def measures(self, measures):
+        self._readings = {}
+        self._gaps_mask = np.ones(self._n_hours, dtype=bool)
+        # Counters as get_hours_per_period(tariff, only_valid=True) and
+        # get_consumption_per_period(tariff) of the tariff of the profile,
+        # the consumption is summed again when the measures are read, see
+        # _sum_consumption
+        self.valid_hours_per_period = Counter()
+        self.consumption_per_period = Counter()
+        for period in self.tariff.energy_periods:
+            self.consumption_per_period[period] = 0
+        self._changed()
+        for measure in measures:
+            self.upsert(measure)
+
+    @property
+    def gaps(self):
+        if self._gaps is None:
+            self._gaps = ProfileGaps.from_mask(
+                self.start_date, self._gaps_mask
+            )
+        return self._gaps
+
+    @gaps.setter
+    def gaps(self, gaps):
+        self._gaps = gaps
+
+    @property
+    def n_hours_measures(self):
+        return len(self._readings)
+
+    def _get_gaps_mask(self):
+        return self._gaps_mask.copy()
+
+    def append(self, measure):
+        """Add the measure of an hour without measure.
+
+        :raises ValueError: if there is a measure at the date of the measure
+        """
+        hour = self._get_hour(measure)
+        if hour in self._readings:
+            raise ValueError(
+                'There is already a measure at {0}'.format(measure.date)
+            )
+        self._set_measure(hour, measure)
+
+    def upsert(self, measure):
+        """Add the measure of an hour or replace the measure of the hour."""
+        hour = self._get_hour(measure)
+        old_measure = self._readings.get(hour)
+        if old_measure is not None:
+            self._count_measure(hour, old_measure, removed=True)
+        self._set_measure(hour, measure)
+
+    def refit(self, tariff, balance, measures, diff=0):
+        """Upsert late measures and fix the profile again.
+
+        It is a fixit of the whole profile, so it costs about the same as
+        fixit. Only the drags of the periods without changes are taken from
+        the previous estimate, adjust or fixit of the profile instead of
+        dragging them again. The result is the same as fixing the profile
+        from scratch.
+
+        :param measures: iterable of ProfileHour
+        :return: the fixed Profile as fixit
+        """
+        for measure in measures:
+            self.upsert(measure)
+        return self.fixit(tariff, balance, diff)
+
+    def _get_hour(self, measure):
+        if type(measure) is not ProfileHour:
+            raise TypeError('{0} is not a ProfileHour'.format(measure))
+        return int(to_epoch_hours([measure.date])[0])
+
+    def _set_measure(self, hour, measure):
+        self._readings[hour] = measure
+        self._count_measure(hour, measure)
+        self._changed()
+
+    def _changed(self):
+        self._measures = None
+        self._gaps = None
+
+    def _count_measure(self, hour, measure, removed=False):
+        """Update the gaps and the counters with a measure added or removed."""
+        has_value = bool(measure.valid) and measure.measure is not None
+        offset = hour * 3600 - self._start
+        if offset % 3600 == 0 and 0 <= offset // 3600 < self._n_hours:
+            self._gaps_mask[offset // 3600] = removed or not has_value
+        if not measure.valid:
+            return
+        period = self._get_period(hour)
+        if removed:
+            self.valid_hours_per_period[period] -= 1
+            if not self.valid_hours_per_period[period]:
+                del self.valid_hours_per_period[period]
+            if measure.measure is not None:
+                self.consumption_per_period[period] -= measure.measure
+        else:
+            self.valid_hours_per_period[period] += 1
+            if measure.measure is not None:
+                self.consumption_per_period[period] += measure.measure
+
+    def _sum_consumption(self):
+        """Sum the consumption of every period in the order of the hours.
+
+        The running totals of the added and removed measures can differ from
+        get_consumption_per_period by the rounding of the floats.
+        """
+        measures = self._measures[self._measures.valid_mask]
+        values = measures.measure.tolist()
+        periods = self._get_measures_periods(self.tariff, valid=True)
+        self.consumption_per_period = self._sum_per_period(
+            self.tariff,
+            [p for p, v in zip(periods, values) if v is not None],
+            [v for v in values if v is not None]
+        )
+
+    def _get_period(self, hour):
+        periods = self._get_span_periods(self.tariff, normalized=True)
+        position = hour - self._start // 3600
+        if 0 <= position < len(periods):
+            return periods[position]
+        return self._classify_hours(self.tariff, [hour])[0]
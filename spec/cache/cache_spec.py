@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+import os
+import shutil
+import tempfile
+from enerdata.cache import LRUCache, DiskCache
+from expects import *
+from mamba import description, it, before, after
+
+
+with description('A LRU cache'):
+
+    with it('must keep the last used items'):
+        cache = LRUCache(maxsize=2)
+        cache['a'] = 1
+        cache['b'] = 2
+        expect(cache['a']).to(equal(1))
+        cache['c'] = 3
+        expect(cache.keys()).to(equal(['a', 'c']))
+        expect(cache.get('b')).to(be_none)
+        expect(cache.info().misses).to(equal(1))
+
+
+with description('A disk cache'):
+    with before.each:
+        self.path = tempfile.mkdtemp()
+        self.cache = DiskCache(os.path.join(self.path, 'cache'))
+
+    with after.each:
+        shutil.rmtree(self.path)
+
+    with it('must store the values in files'):
+        expect(self.cache.get('key')).to(be_none)
+        self.cache['key'] = b'value'
+        expect(self.cache.get('key')).to(equal(b'value'))
+        expect('key' in self.cache).to(be_true)
+        expect(self.cache.keys()).to(equal(['key']))
+        expect(DiskCache(self.cache.path).get('key')).to(equal(b'value'))
+
+    with it('must replace the values without temporary files'):
+        self.cache['key'] = b'value'
+        self.cache['key'] = b'other'
+        expect(self.cache.get('key')).to(equal(b'other'))
+        expect(os.listdir(self.cache.path)).to(equal(['key.cache']))
+
+    with it('must delete the values'):
+        self.cache['key'] = b'value'
+        del self.cache['key']
+        expect(self.cache.get('key')).to(be_none)
+
+        def delete():
+            del self.cache['key']
+
+        expect(delete).to(raise_error(KeyError))
+
+    with it('must lock a key'):
+        cache = self.cache
+        with cache.lock('key'):
+            cache['key'] = b'value'
+        expect(self.cache.get('key')).to(equal(b'value'))
@@ -1,5 +1,6 @@
 # -*- coding: utf-8 -*-
 from datetime import datetime, timedelta
+import numpy as np
 from enerdata.contracts.tariff import *
 from expects.testing import failure
 from expects import *
@@ -128,6 +129,28 @@ with context('A tariff'):
         dt = TIMEZONE.localize(datetime(2015, 12, 27, 1, 0, 0))
         period = self.tariff.get_period_by_date(dt)
         assert period.code == 'P6'
+
+    with it('should compile the periods of a day in a table'):
+        tariff = T30TD()
+        dt = TIMEZONE.localize(datetime(2021, 7, 1, 10, 0, 0))
+        period = tariff.get_period_by_date(dt)
+        table = tariff.get_periods_table(False, None, (('1', 'A'), ))
+        expect(table).to(have_len(24))
+        assert table[10] is period
+        assert [p.code for p in table[7:10]] == ['P6', 'P2', 'P1']
+        assert tariff.get_period_by_date(dt + timedelta(hours=1)) is table[11]
+
+    with it('should reset the table of periods when the periods change'):
+        tariff = T20DHA()
+        dt = TIMEZONE.localize(datetime(2015, 12, 24, 19, 0, 0))
+        assert tariff.get_period_by_date(dt).code == 'P1'
+        tariff.periods = (
+            TariffPeriod('P1', 'te'),
+            TariffPeriod('P1', 'tp')
+        )
+        period = tariff.get_period_by_date(dt)
+        assert period is tariff.periods[0]
+
     with it('should allow to check if a set of powers is correct'):
         tari_T20A = T20A()
         expect(lambda: tari_T20A.evaluate_powers([-10])).to(
@@ -2009,6 +2032,22 @@ with description("TD tariffs"):
             assert self.tarifa.kva == 50
             assert self.tarifa.low_voltage_measure
 
+        with it('must apply the losses to every hour of a curve'):
+            from enerdata.profiles.profile import ProfileHour, ProfileMeasures
+            the_tariff = T61TD(kva=50)
+            start = TIMEZONE.localize(datetime(2022, 3, 1, 1))
+            measures = [
+                ProfileHour(start + timedelta(hours=idx), value, True, 0)
+                for idx, value in enumerate([0, 10, 25, 101])
+            ]
+            # my_round(value * 1.04, 2) + my_round(0.01 * 50, 2)
+            expected = [0.5, 10.9, 26.5, 105.54]
+            measures_list = the_tariff.apply_curve_losses(list(measures))
+            expect([m.measure for m in measures_list]).to(equal(expected))
+            columns = the_tariff.apply_curve_losses(ProfileMeasures(measures))
+            expect(columns.measure.tolist()).to(equal(expected))
+            expect(list(columns)).to(equal(measures_list))
+
     # Tariff 6.2TD
     with context("6.2TD"):
         with before.all:
@@ -2961,3 +3000,81 @@ with description("TD tariffs"):
             assert self.tarifa.get_period_by_date(dia + timedelta(hours=22), self.holidays).code == 'P6'
             assert self.tarifa.get_period_by_date(dia + timedelta(hours=23), self.holidays).code == 'P6'
             assert self.tarifa.get_period_by_date(dia + timedelta(hours=23, minutes=59), self.holidays).code == 'P6'
+
+
+with description('Classifying a range of hours by period'):
+    with before.all:
+        self.start = TIMEZONE.localize(datetime(2021, 10, 1, 0, 59))
+        self.end = TIMEZONE.localize(datetime(2021, 11, 30, 23, 59))
+
+    with it('must return the same periods as get_period_by_date'):
+        for tariff in (T20TD(), T30TD(geom_zone='3'), T20DHA(), T30A()):
+            hours = []
+            hour = self.start
+            while hour <= self.end:
+                hours.append(hour)
+                hour += timedelta(hours=1)
+            expected = [tariff.get_period_by_date(h).code for h in hours]
+            periods = tariff.get_periods_for_range(self.start, self.end)
+            expect(list(periods)).to(equal(expected))
+            normalized = [TIMEZONE.normalize(h) for h in hours]
+            expected = [tariff.get_period_by_date(h).code for h in normalized]
+            expect(list(tariff.classify(normalized))).to(equal(expected))
+
+    with it('must use the holidays if they are passed'):
+        tariff = T20TD()
+        day = datetime(2021, 10, 6, 12)
+        periods = tariff.classify([day])
+        expect(list(periods)).to(equal(['P1']))
+        periods = tariff.classify([day], holidays=[day.date()])
+        expect(list(periods)).to(equal(['P3']))
+        tariff = T31A()
+        day = datetime(2021, 3, 3, 12)
+        expect(list(tariff.classify([day]))).to(equal(['P2']))
+        periods = tariff.classify([day], holidays=[day.date()])
+        expect(list(periods)).to(equal(['P6']))
+
+    with it('must fail classifying the power periods of a pre-TD tariff'):
+        tariff = T20DHA()
+
+        def classify():
+            tariff.classify([datetime(2021, 3, 3, 12)], magn='tp')
+
+        expect(classify).to(raise_error(ValueError))
+
+    with it('must classify the power periods'):
+        tariff = T20TD()
+        day = datetime(2021, 10, 6)
+        hours = [day + timedelta(hours=h) for h in range(24)]
+        periods = tariff.classify(hours, magn='tp')
+        expect(list(periods)).to(equal(['P2'] * 8 + ['P1'] * 16))
+
+    with it('must return an empty list of periods for an empty range'):
+        periods = T20TD().get_periods_for_range(self.end, self.start)
+        expect(periods).to(have_len(0))
+
+
+with description('Getting the daytypes of the days'):
+
+    with it('must change the daytypes with the new tariffs'):
+        day = datetime(2021, 5, 31)
+        expect(get_daytype_by_date_and_zone(day, '1', [])).to(equal('C'))
+        day = datetime(2021, 6, 1)
+        expect(get_daytype_by_date_and_zone(day, '1', [])).to(equal('B1'))
+
+    with it('must return the same daytypes as get_daytype_by_date_and_zone'):
+        days = np.arange('2020-01-01', '2023-01-01', dtype='datetime64[D]')
+        for zone in ('1', '2', '3', '4', '5'):
+            daytypes = get_daytypes_by_dates_and_zone(days, zone)
+            expected = []
+            for day in days.astype(datetime):
+                day = datetime(day.year, day.month, day.day)
+                expected.append(get_daytype_by_date_and_zone(
+                    day, zone, get_holidays(day.year)
+                ))
+            expect(list(daytypes)).to(equal(expected))
+
+    with it('must use the holidays if they are passed'):
+        days = np.array(['2021-07-05', '2021-07-06'], dtype='datetime64[D]')
+        daytypes = get_daytypes_by_dates_and_zone(days, '1', [datetime(2021, 7, 5).date()])
+        expect(list(daytypes)).to(equal(['D', 'A']))
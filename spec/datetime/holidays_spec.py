@@ -0,0 +1,41 @@
+# -*- coding: utf-8 -*-
+from datetime import date
+from enerdata.calendars import REECalendar
+from enerdata.datetime.holidays import get_holidays, HOLIDAYS_CACHE
+from expects import *
+from mamba import description, it, before
+from workalendar.europe import Spain
+
+
+with description('Getting the holidays of a year'):
+    with before.each:
+        HOLIDAYS_CACHE.clear()
+
+    with it('must return the holidays of the REE calendar'):
+        holidays = get_holidays(2022)
+        expect(holidays).to(be_a(frozenset))
+        expect(holidays).to(equal(frozenset(REECalendar().holidays_set(2022))))
+        expect(holidays).to(contain(date(2022, 1, 6)))
+
+    with it('must compute the holidays of a year only once'):
+        get_holidays(2021)
+        get_holidays(2021)
+        get_holidays(2021)
+        info = HOLIDAYS_CACHE.info()
+        expect(info.misses).to(equal(1))
+        expect(info.hits).to(equal(2))
+        expect(info.currsize).to(equal(1))
+
+    with it('must cache the holidays by calendar'):
+        spain = get_holidays(2017, Spain())
+        ree = get_holidays(2017)
+        expect(spain).to(contain(date(2017, 1, 6)))
+        expect(ree).not_to(contain(date(2017, 1, 6)))
+        expect(HOLIDAYS_CACHE.info().currsize).to(equal(2))
+
+    with it('must keep only the last used years'):
+        for year in range(1900, 1900 + HOLIDAYS_CACHE.maxsize + 10):
+            get_holidays(year)
+        expect(len(HOLIDAYS_CACHE)).to(equal(HOLIDAYS_CACHE.maxsize))
+        expect((REECalendar, 1900) in HOLIDAYS_CACHE).to(be_false)
+        expect((REECalendar, 1900 + HOLIDAYS_CACHE.maxsize + 9) in HOLIDAYS_CACHE).to(be_true)
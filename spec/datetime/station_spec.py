@@ -9,3 +9,14 @@ with description('The station module'):
         assert get_station(datetime(2014, 10, 26, 2)) == 'winter'
         assert get_station(datetime(2014, 3, 30, 2)) == 'summer'
         assert get_station(TIMEZONE.localize(datetime(2014, 10, 26, 2), is_dst=True)) == 'summer'
+
+    with it('has to return the stations of a list of instants'):
+        from datetime import timedelta
+        from enerdata.datetime.station import get_stations
+        from enerdata.datetime.epoch import walls_and_instants
+        start = TIMEZONE.localize(datetime(2014, 3, 30))
+        dts = [TIMEZONE.normalize(start + timedelta(hours=h)) for h in range(5)]
+        walls, instants = walls_and_instants(dts)
+        stations = get_stations(instants)
+        assert list(stations) == [get_station(dt) for dt in dts]
+        assert list(stations) == ['winter', 'winter', 'summer', 'summer', 'summer']
@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+from datetime import datetime, timedelta
+from enerdata.profiles.chunked import ChunkedProfile
+from enerdata.profiles.profile import Profile, ProfileHour, REProfileFlat
+from enerdata.contracts.tariff import T30TD
+from enerdata.datetime.timezone import TIMEZONE
+from expects import *
+from mamba import description, it, before
+import random
+
+
+with description('A chunked profile'):
+    with before.all:
+        self.start = TIMEZONE.localize(datetime(2022, 1, 1, 1))
+        self.end = TIMEZONE.localize(datetime(2022, 12, 1))
+        self.tariff = T30TD()
+        self.tariff.cof = 'A'
+        rnd = random.Random(1)
+        self.measures = []
+        hour = self.start
+        while hour <= self.end:
+            # Leave a gap every week and some random gaps and invalid hours
+            if hour.day % 7 and rnd.random() > 0.05:
+                self.measures.append(ProfileHour(
+                    hour, rnd.randint(0, 50), rnd.random() > 0.01, 0.0
+                ))
+            hour = TIMEZONE.normalize(hour + timedelta(hours=1))
+        self.balance = dict((p, 40000) for p in self.tariff.energy_periods)
+
+    def estimate(self, chunk_hours=None, **kwargs):
+        profile = Profile(self.start, self.end, self.measures, **kwargs)
+        profile.profile_class = REProfileFlat
+        expected = list(profile.estimate(self.tariff, self.balance).measures)
+        chunked = ChunkedProfile(
+            self.start, self.end, self.measures, chunk_hours=chunk_hours,
+            **kwargs
+        )
+        chunked.profile_class = REProfileFlat
+        chunks = list(chunked.estimate(self.tariff, self.balance))
+        measures = []
+        for chunk in chunks:
+            expect(chunk.gaps).to(be_empty)
+            measures.extend(chunk.measures)
+        return chunks, measures, expected
+
+    with it('must split the hours by months'):
+        chunked = ChunkedProfile(self.start, self.end, [])
+        chunks = chunked.get_chunks()
+        expect(chunks).to(have_len(11))
+        expect(chunks[0]).to(equal((
+            self.start, self.start + timedelta(hours=743)
+        )))
+        expect(TIMEZONE.normalize(chunks[3][0])).to(equal(
+            TIMEZONE.localize(datetime(2022, 4, 1, 1))
+        ))
+        expect(chunks[-1][1]).to(equal(self.end))
+
+    with it('must estimate by months as the whole profile'):
+        chunks, measures, expected = self.estimate(accumulated=0.3)
+        expect(chunks).to(have_len(11))
+        expect(measures).to(equal(expected))
+
+    with it('must estimate by hours as the whole profile'):
+        chunks, measures, expected = self.estimate(
+            chunk_hours=100, drag_by_periods=False
+        )
+        expect(chunks).to(have_len(81))
+        expect(measures).to(equal(expected))
+
+    with it('must read the measures of a function'):
+        chunked = ChunkedProfile(
+            self.start, self.end, lambda: iter(self.measures)
+        )
+        chunked.profile_class = REProfileFlat
+        measures = []
+        for chunk in chunked.estimate(self.tariff, self.balance):
+            measures.extend(chunk.measures)
+        expect(measures).to(equal(self.estimate()[2]))
+
+    with it('must fail estimating unsorted measures'):
+        chunked = ChunkedProfile(
+            self.start, self.end, self.measures[::-1]
+        )
+        chunked.profile_class = REProfileFlat
+
+        def estimate():
+            list(chunked.estimate(self.tariff, self.balance))
+
+        expect(estimate).to(raise_error(ValueError))
@@ -1,7 +1,9 @@
 # -*- coding: utf-8 -*-
 from enerdata.profiles.profile import *
+from enerdata.profiles import my_round, round_array
 from expects import *
 from mamba import description, it, context
+import random
 
 
 with description('A dragger object'):
@@ -76,3 +78,74 @@ with description('A dragger object'):
                 total_kW = sum(curve_kW)
                 diff = abs((total_kW * 1000) - total_W)
                 expect(diff).to(be_below_or_equal(1000))
+
+    with context('Dragging many numbers at once'):
+        with it('must return the same as dragging them one by one'):
+            numbers = [0.5, 0, 1.6, 2.3, 1.4, 5.2, 0, 32.453, 1.046]
+            keys = ['a', 'a', 'b', 'a', 'b', 'a', 'a', 'b', 'b']
+            d = Dragger()
+            expected = []
+            expected_drags = []
+            for number, key in zip(numbers, keys):
+                expected.append(d.drag(number, key=key))
+                expected_drags.append(d[key])
+            d_many = Dragger()
+            aprox, drags = d_many.drag_many(numbers, keys)
+            expect(aprox).to(equal(expected))
+            expect(drags).to(equal(expected_drags))
+            expect(d_many).to(equal(d))
+
+        with it('must use the same key for all the numbers by default'):
+            d = Dragger()
+            aprox, drags = d.drag_many([0.5, 0, 0.4])
+            expect(aprox).to(equal([1, 0, 0]))
+            expect(drags).to(equal(
+                [Decimal('-0.5'), Decimal('-0.5'), Decimal('-0.1')]
+            ))
+            expect(d['default']).to(equal(Decimal('-0.1')))
+
+    with it('must not change the precision of the decimal context'):
+        from decimal import getcontext
+        precision = getcontext().prec
+        d = Dragger()
+        d.drag(1.23456789012345)
+        d.drag_many([2.5, 3.25])
+        expect(getcontext().prec).to(equal(precision))
+
+
+with description('Rounding an array'):
+    with it('must round half away from zero as my_round'):
+        values = [2.5, -2.5, 0.5, -0.5, -0.4, 1.005, 2.675, -2.675, 3]
+        for d in (0, 2):
+            expected = [my_round(v, d) for v in values]
+            expect(round_array(values, d).tolist()).to(equal(expected))
+
+    with it('must not return negative zeros'):
+        rounded = round_array([-0.4, -0.001])
+        expect([repr(v) for v in rounded.tolist()]).to(equal(['0.0', '0.0']))
+
+
+with description('A chain of drags'):
+    with it('must be the same as drag_many reusing a previous chain'):
+        rnd = random.Random(3)
+        numbers = [rnd.uniform(0, 10) for _ in range(300)]
+        previous = Dragger().drag_chain(numbers)
+        for changes in ([5], [150, 151], [299], [0, 298]):
+            new_numbers = list(numbers)
+            for idx in changes:
+                new_numbers[idx] += 0.37
+            dragger = Dragger()
+            aprox, drags = dragger.drag_many(new_numbers)
+            chain_dragger = Dragger()
+            chain = chain_dragger.drag_chain(new_numbers, previous=previous)
+            expect(chain.aprox).to(equal(aprox))
+            expect(chain.drags).to(equal(drags))
+            expect(chain_dragger).to(equal(dragger))
+
+    with it('must not reuse a chain that started with another drag'):
+        previous = Dragger().drag_chain([0.5, 0.5, 0.5])
+        dragger = Dragger()
+        dragger.drag(0.3)
+        chain = dragger.drag_chain([0.5, 0.5, 0.5], previous=previous)
+        expect(chain.aprox).to(equal([1, 0, 1]))
+        expect(chain.residue).to(equal(Decimal('0.3')))
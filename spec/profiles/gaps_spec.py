@@ -305,3 +305,49 @@ with description('A complete profile with different energy than balance'):
                 expect(profile.adjusted_periods).to(
                     contain_exactly(*adjusted_periods)
                 )
+
+            with it('must classify the hours only once'):
+                tariff = T20DHA()
+                measures = list(self.profile.measures)
+                balance = Profile(
+                    self.profile.start_date, self.profile.end_date, measures
+                ).get_consumption_per_period(tariff)
+                for period in balance:
+                    balance[period] += 10
+                calls = []
+                classify_arrays = tariff.classify_arrays
+
+                def counted_classify_arrays(*args, **kwargs):
+                    calls.append(args)
+                    return classify_arrays(*args, **kwargs)
+
+                tariff.classify_arrays = counted_classify_arrays
+                profile = Profile(
+                    self.profile.start_date, self.profile.end_date, measures
+                )
+                expect(profile.get_consumption_per_period(tariff)).to(
+                    equal(self.profile.get_consumption_per_period(tariff))
+                )
+                profile = profile.adjust(tariff, balance)
+                valid_hours = profile.get_hours_per_period(
+                    tariff, only_valid=True
+                )
+                expect(sum(valid_hours.values())).to(equal(len(measures)))
+                expect(calls).to(have_len(1))
+                expect(profile.gaps).to(be_empty)
+                expect(profile.total_consumption).to(
+                    equal(sum(balance.values()))
+                )
+                expect(list(self.profile.measures)).to(equal(measures))
+
+            with it('must classify the hours again if the dates change'):
+                tariff = T20DHA()
+                profile = Profile(
+                    self.profile.start_date, self.profile.end_date,
+                    self.profile.measures
+                )
+                hours = profile.get_hours_per_period(tariff)
+                profile.end_date -= timedelta(days=1)
+                expect(sum(profile.get_hours_per_period(tariff).values())).to(
+                    equal(sum(hours.values()) - 24)
+                )
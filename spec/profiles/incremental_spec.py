@@ -0,0 +1,134 @@
+# -*- coding: utf-8 -*-
+from datetime import datetime, timedelta
+from enerdata.profiles.profile import (
+    IncrementalProfile, Profile, ProfileHour, REProfileFlat
+)
+from enerdata.contracts.tariff import T30TD
+from enerdata.datetime.timezone import TIMEZONE
+from expects import *
+from mamba import description, it, before
+import random
+
+
+with description('An incremental profile'):
+    with before.all:
+        self.start = TIMEZONE.localize(datetime(2022, 3, 1, 1))
+        self.end = TIMEZONE.localize(datetime(2022, 4, 1))
+        self.tariff = T30TD()
+        self.tariff.cof = 'A'
+        rnd = random.Random(1)
+        self.measures = []
+        hour = self.start
+        while hour <= self.end:
+            # Leave a gap on the 15th
+            if hour.day != 15:
+                self.measures.append(ProfileHour(
+                    TIMEZONE.normalize(hour), rnd.randint(0, 50), True, 0.0
+                ))
+            hour += timedelta(hours=1)
+        rnd.shuffle(self.measures)
+        self.balance = dict((p, 8000) for p in self.tariff.energy_periods)
+
+    with it('must be the same as a profile of the appended measures'):
+        profile = IncrementalProfile(self.start, self.end, self.tariff)
+        for measure in self.measures:
+            profile.append(measure)
+        expected = Profile(self.start, self.end, sorted(self.measures))
+        expect(list(profile.measures)).to(equal(list(expected.measures)))
+        expect(profile.gaps).to(equal(expected.gaps))
+        expect(profile.gaps).to(have_len(24))
+        expect(profile.valid_hours_per_period).to(equal(
+            expected.get_hours_per_period(self.tariff, only_valid=True)
+        ))
+        expect(profile.consumption_per_period).to(equal(
+            expected.get_consumption_per_period(self.tariff)
+        ))
+
+    with it('must estimate as a profile of the same measures'):
+        profile = IncrementalProfile(self.start, self.end, self.tariff)
+        profile.profile_class = REProfileFlat
+        for measure in self.measures[:100]:
+            profile.append(measure)
+        estimation = profile.estimate(self.tariff, self.balance)
+        expected = Profile(self.start, self.end, sorted(self.measures[:100]))
+        expected.profile_class = REProfileFlat
+        expect(list(estimation.measures)).to(equal(
+            list(expected.estimate(self.tariff, self.balance).measures)
+        ))
+        for measure in self.measures[100:]:
+            profile.append(measure)
+        expect(profile.estimate(self.tariff, self.balance).gaps).to(be_empty)
+
+    with it('must replace the measure of an hour when upserting'):
+        profile = IncrementalProfile(
+            self.start, self.end, self.tariff, self.measures
+        )
+        measure = self.measures[0]
+        consumption = profile.consumption_per_period.copy()
+        period = self.tariff.get_period_by_date(
+            measure.date - timedelta(minutes=1)
+        ).code
+        profile.upsert(measure._replace(measure=measure.measure + 10))
+        consumption[period] += 10
+        expect(profile.consumption_per_period).to(equal(consumption))
+        expect(profile.n_hours_measures).to(equal(len(self.measures)))
+
+        profile.upsert(measure._replace(valid=False))
+        consumption[period] -= measure.measure + 10
+        expect(profile.consumption_per_period).to(equal(consumption))
+        expect(profile.gaps).to(have_len(25))
+        expect(profile.gaps).to(contain(measure.date))
+
+    with it('must sum the float consumption again when reading measures'):
+        rnd = random.Random(2)
+        measures = [
+            m._replace(measure=rnd.random() * 10) for m in self.measures
+        ]
+        profile = IncrementalProfile(self.start, self.end, self.tariff)
+        for measure in measures:
+            profile.append(measure)
+        for measure in measures[:200]:
+            profile.upsert(measure._replace(measure=rnd.random() * 10))
+        expected = Profile(self.start, self.end, list(profile.measures))
+        expect(profile.consumption_per_period).to(equal(
+            expected.get_consumption_per_period(self.tariff)
+        ))
+
+    with it('must fail appending a measure of an hour with measure'):
+        profile = IncrementalProfile(
+            self.start, self.end, self.tariff, self.measures[:1]
+        )
+
+        def append_again():
+            profile.append(self.measures[0])
+
+        expect(append_again).to(raise_error(ValueError))
+
+    with it('must fail adding measures without a normalized date'):
+        profile = IncrementalProfile(self.start, self.end, self.tariff)
+
+        def append_not_normalized():
+            profile.append(ProfileHour(
+                self.start + timedelta(days=30), 1, True, 0.0
+            ))
+
+        expect(append_not_normalized).to(raise_error(TypeError))
+
+    with it('must fix the late measures as fixing the profile again'):
+        profile = IncrementalProfile(
+            self.start, self.end, self.tariff, self.measures[::2],
+            accumulated=0.3
+        )
+        profile.profile_class = REProfileFlat
+        profile.fixit(self.tariff, self.balance)
+        for late_measures in (self.measures[1:20:2], self.measures[21:40:2]):
+            fixed = profile.refit(self.tariff, self.balance, late_measures)
+            expected = Profile(
+                self.start, self.end, list(profile.measures), accumulated=0.3
+            )
+            expected.profile_class = REProfileFlat
+            expected = expected.fixit(self.tariff, self.balance)
+            expect(list(fixed.measures)).to(equal(list(expected.measures)))
+            expect(fixed.adjusted_periods).to(
+                equal(expected.adjusted_periods)
+            )
@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+from datetime import date, datetime, timedelta
+from enerdata.profiles.profile import (
+    Coefficent, Coefficients, Profile, ProfileHour, Profiler, REEProfile,
+    get_tariff_coeffs_list
+)
+from enerdata.profiles.parallel import ParallelProfiler, set_ree_months
+from enerdata.contracts.tariff import T20TD
+from enerdata.datetime.timezone import TIMEZONE
+from enerdata.metering.measure import EnergyMeasure
+from expects import *
+from mamba import description, it, before, after
+import random
+
+
+with description('A parallel profiler'):
+    with before.all:
+        start = TIMEZONE.localize(datetime(2022, 3, 1, 1))
+        names = get_tariff_coeffs_list(2022, 3)
+        rnd = random.Random(1)
+        cofs = [
+            Coefficent(
+                TIMEZONE.normalize(start + timedelta(hours=h)),
+                dict((name, rnd.random() * 1e-4) for name in names)
+            )
+            for h in range(60 * 24)
+        ]
+        self.coefficients = Coefficients(cofs)
+        self.tariff = T20TD()
+        self.measures_sets = [
+            [
+                EnergyMeasure(
+                    day, period, 0, consumption=rnd.randint(0, 900)
+                )
+                for day in (date(2022, 3, 1), date(2022, 3, 31))
+                for period in self.tariff.energy_periods.values()
+            ]
+            for _ in range(7)
+        ]
+        end = TIMEZONE.localize(datetime(2022, 4, 1))
+        self.items = []
+        for _ in range(3):
+            measures = []
+            hour = start
+            while hour <= end:
+                if rnd.random() < 0.7:
+                    measures.append(ProfileHour(
+                        TIMEZONE.normalize(hour), rnd.randint(0, 5), True, 0.0
+                    ))
+                hour += timedelta(hours=1)
+            self.items.append((
+                Profile(start, end, measures), self.tariff,
+                dict((code, 3000) for code in self.tariff.energy_periods)
+            ))
+
+    with before.each:
+        REEProfile._CACHE.clear()
+
+    with after.each:
+        REEProfile._CACHE.clear()
+
+    with it('must keep the whole months of the coefficients for REEProfile'):
+        months = set_ree_months(self.coefficients)
+        # April is not whole
+        expect(months).to(equal([(2022, 3)]))
+        expect(REEProfile.get(2022, 3)).to(
+            equal(self.coefficients.get_range(date(2022, 3, 1), date(2022, 3, 31)))
+        )
+
+    with it('must drop the months of the coefficients loaded before'):
+        import shutil
+        import tempfile
+        from enerdata.profiles import parallel
+        directories = [tempfile.mkdtemp(), tempfile.mkdtemp()]
+        try:
+            self.coefficients.save(directories[0])
+            Coefficients(self.coefficients.get_range(
+                date(2022, 4, 1), date(2022, 4, 30)
+            )).save(directories[1])
+            REEProfile._CACHE['202201'] = []
+            parallel._get_coefficients(directories[0])
+            expect(REEProfile._CACHE.keys()).to(contain('202201', '202203'))
+            parallel._get_coefficients(directories[1])
+            expect(REEProfile._CACHE.keys()).to(equal(['202201']))
+        finally:
+            parallel._WORKER_COEFFICIENTS.clear()
+            for directory in directories:
+                shutil.rmtree(directory)
+
+    with it('must profile as Profiler for any number of workers'):
+        expected = list(Profiler(self.coefficients).profile_batch(
+            self.tariff, self.measures_sets
+        ))
+        for max_workers, chunksize in ((1, 7), (2, 3)):
+            profiler = ParallelProfiler(
+                self.coefficients, max_workers=max_workers, chunksize=chunksize
+            )
+            result = profiler.profile(self.tariff, self.measures_sets)
+            expect(result).to(have_len(len(expected)))
+            for columns, expected_columns in zip(result, expected):
+                for key, values in expected_columns.items():
+                    expect(columns[key].tolist()).to(equal(values.tolist()))
+
+    with it('must fix the profiles as Profile.fixit'):
+        set_ree_months(self.coefficients)
+        expected = [
+            profile.fixit(tariff, balance)
+            for profile, tariff, balance in self.items
+        ]
+        profiler = ParallelProfiler(
+            self.coefficients, max_workers=2, chunksize=2
+        )
+        result = profiler.fixit(self.items)
+        expect([list(p.measures) for p in result]).to(equal(
+            [list(p.measures) for p in expected]
+        ))
@@ -5,6 +5,7 @@ from enerdata.contracts.tariff import (T20A, T20DHA, T20DHS, T21A, T21DHA,
                                        T21DHS, T30A, T31A, T30A_one_period,
                                        T31A_one_period, TRE, T20TD, T30TD)
 from enerdata.metering.measure import *
+from enerdata.datetime.epoch import to_epoch_seconds, from_epoch_hours
 from expects import *
 from mamba import description, it, context, before
 
@@ -117,6 +118,441 @@ with description("A coeficient"):
         for act_cof in cofs:
             assert act_cof.cof == random_cof, "RE HYDRAULIC not correctly coeffs"
 
+    with it('should get the RE coefficients by columns'):
+        start = TIMEZONE.localize(datetime(2022, 3, 26, 1))
+        end = TIMEZONE.localize(datetime(2022, 4, 2))
+        for profile in (REProfileZone1, REProfileHydraulic, REProfileFlat):
+            cofs = profile.get_range(start, end)
+            expect(cofs).to(have_len(7 * 24 - 1))
+            expect(cofs[-1].hour).to(equal(end))
+            coefficients = profile.get_coefficients(start, end)
+            expect(coefficients.hours.tolist()).to(equal(
+                Coefficients(cofs).hours.tolist()
+            ))
+            expect(coefficients.values['A'].tolist()).to(equal(
+                [c.cof['A'] for c in cofs]
+            ))
+
+    with it('should read the tables of the RE profiles once'):
+        tables = dict(REProfile._TABLES)
+        try:
+            REProfile._TABLES.clear()
+            table = REProfileZone3.get_table()
+            expect(table.shape).to(equal((13, 25)))
+            expect(REProfileZone3.get_table()).to(be(table))
+            # The coefficient of the solar hour 11 of July
+            start = TIMEZONE.localize(datetime(2020, 7, 1, 13))
+            cofs = REProfileZone3.get_range(start, start)
+            expect(cofs[0].cof['A']).to(equal(table[7, 11]))
+            hydraulic = REProfileHydraulic.get_table()
+            expect(hydraulic[2, 1:].tolist()).to(equal([0.36] * 24))
+            expect(REProfile._TABLES).to(have_len(2))
+        finally:
+            REProfile._TABLES.clear()
+            REProfile._TABLES.update(tables)
+
+
+    with it('should store the coefficients by columns'):
+        c = Coefficients(self.cofs)
+        expect(c.hours).to(have_len(365 * 24))
+        expect(sorted(c.values)).to(equal(['A', 'B']))
+        expect(c.values['A'].dtype).to(equal(np.float64))
+        expect(c.coefs).to(equal(self.cofs))
+
+    with it('should build the columns again when the coefficients change'):
+        columns = Coefficients(self.cofs[:3])
+        c = Coefficients.from_columns(columns.hours, columns.values)
+        c.coefs.append(self.cofs[3])
+        expect(c).to(have_len(4))
+        expect(c.get(self.cofs[3].hour)).to(equal(self.cofs[3]))
+        c.coefs[0] = Coefficent(self.cofs[0].hour, {'A': 1, 'B': 2})
+        expect(c.get_values(None, 'B', positions=[0]).tolist()).to(
+            equal([2.0])
+        )
+        c.coefs = self.cofs
+        expect(c.coefs).to(equal(self.cofs))
+
+    with it('should get the values of a coefficient for many hours'):
+        c = Coefficients(self.cofs)
+        dt = TIMEZONE.localize(datetime(2014, 12, 23, 0))
+        c.insert_coefs((Coefficent(dt, {'A': 0.5, 'B': 0.001}), ))
+        instant = to_epoch_seconds(dt)
+        values = c.get_values([instant, instant - 60, instant + 1], 'A')
+        expect(values.tolist()).to(equal([0.5, 0.5, 0]))
+        expect(lambda: c.get_values([instant], 'C')).to(raise_error(KeyError))
+
+    with it('should search the hours if they are not contiguous'):
+        c = Coefficients([self.cofs[0], self.cofs[2], self.cofs[3]])
+        expect(c.get(self.cofs[1].hour - timedelta(minutes=1))).to(
+            equal(self.cofs[2])
+        )
+        expect(c.get_range(date(2014, 1, 1), date(2014, 1, 1))).to(have_len(3))
+
+    with it('should keep the coefficients of each hour'):
+        cofs = [
+            Coefficent(self.cofs[0].hour, {'A': 0.1}),
+            Coefficent(self.cofs[1].hour, {'A': 0.2, 'B': 0.3}),
+        ]
+        c = Coefficients(cofs)
+        expect(c.coefs).to(equal(cofs))
+        expect(lambda: c.get_values(None, 'B', positions=[0, 1])).to(
+            raise_error(KeyError)
+        )
+        expect(c.get_values(None, 'B', positions=[1]).tolist()).to(
+            equal([0.3])
+        )
+
+
+with description('A PERFF file of REE'):
+    with before.all:
+        import zlib
+        lines = ['A;M;D;H;V;2.0TD;3.0TD;3.0TDVE']
+        for day, n_hours in ((29, 24), (30, 25), (31, 24)):
+            for hour in range(1, n_hours + 1):
+                lines.append('2022;10;{0};{1};{2};{3};0.1;0.2'.format(
+                    day, hour, int(day < 30 or hour < 3), day * 100 + hour
+                ))
+        self.content = ('\r\n'.join(lines) + '\r\n').encode('iso8859-15')
+        self.zlib = zlib
+
+    with it('must have the hours of the rows after the midnight of the day'):
+        coefficients = parse_perff(
+            iter_lines([self.content]), 2022, 10
+        )
+        expect(len(coefficients)).to(equal(73))
+        start = TIMEZONE.localize(datetime(2022, 10, 29))
+        expected = [
+            Coefficent(
+                TIMEZONE.normalize(start + timedelta(hours=n)),
+                {'2.0TD': float(v), '3.0TD': 0.1, '3.0TDVE': 0.2}
+            )
+            for n, v in enumerate(
+                [2900 + h for h in range(1, 25)] +
+                [3000 + h for h in range(1, 26)] +
+                [3100 + h for h in range(1, 25)], 1
+            )
+        ]
+        expect(coefficients.coefs).to(equal(expected))
+        expect(coefficients.coefs[25].hour.dst()).to(equal(timedelta(hours=1)))
+        expect(coefficients.coefs[26].hour.dst()).to(equal(timedelta(0)))
+
+    with it('must read the lines of the compressed chunks'):
+        import bz2
+        compressor = self.zlib.compressobj(9, self.zlib.DEFLATED, 31)
+        gz = compressor.compress(self.content) + compressor.flush()
+        bz = bz2.compress(self.content)
+        chunks = lambda content: [
+            content[i:i + 7] for i in range(0, len(content), 7)
+        ]
+        lines = self.content.split(b'\n')
+        expect(list(iter_lines(chunks(self.content)))).to(equal(lines))
+        expect(list(iter_lines(
+            chunks(gz), self.zlib.decompressobj(16 + self.zlib.MAX_WBITS)
+        ))).to(equal(lines))
+        expect(list(iter_lines(
+            chunks(bz), bz2.BZ2Decompressor()
+        ))).to(equal(lines))
+
+    with it('must fail with an incomplete row'):
+        content = self.content + b'2022;11;1;1;0;1.0\n'
+        expect(lambda: parse_perff(iter_lines([content]), 2022, 10)).to(
+            raise_error(ValueError)
+        )
+
+
+with description('The REE profiles of a month'):
+    with before.each:
+        import tempfile
+        from enerdata.cache import DiskCache
+        self.path = tempfile.mkdtemp()
+        self.disk_cache = REEProfile.disk_cache
+        self.download = REEProfile.download
+        REEProfile.disk_cache = DiskCache(self.path, suffix='.npz')
+        REEProfile._CACHE.clear()
+        self.downloads = []
+        start = TIMEZONE.localize(datetime(2022, 1, 1))
+        cofs = [
+            Coefficent(
+                TIMEZONE.normalize(start + timedelta(hours=h)),
+                {'2.0TD': h * 1e-5, '3.0TD': 0.1, '3.0TDVE': 0.2}
+            )
+            for h in range(1, 31 * 24 + 1)
+        ]
+
+        def download(cls, year, month):
+            self.downloads.append((year, month))
+            return cofs
+
+        REEProfile.download = classmethod(download)
+        self.cofs = cofs
+
+    with after.each:
+        import shutil
+        shutil.rmtree(self.path)
+        REEProfile.disk_cache = self.disk_cache
+        REEProfile.download = self.download
+        REEProfile._CACHE.clear()
+
+    with it('must download a month only once'):
+        expect(REEProfile.get(2022, 1)).to(equal(self.cofs))
+        expect(REEProfile.get(2022, 1)).to(equal(self.cofs))
+        expect(self.downloads).to(equal([(2022, 1)]))
+
+    with it('must lock the months with a fixed number of locks'):
+        locks = set()
+        for month in range(1, 13):
+            REEProfile.get(2022, month)
+            locks.add(REEProfile._get_lock(2022, month))
+        locks.add(REEProfile._get_lock(2023, 1))
+        expect(locks).to(have_len(13))
+        expect(REEProfile._locks).to(have_len(32))
+        expect(REEProfile._get_lock(2022, 1)).to(
+            be(REEProfile._get_lock(2024, 9))
+        )
+
+    with it('must read the months from the disk cache'):
+        REEProfile.get(2022, 1)
+        REEProfile._CACHE.clear()
+        expect(REEProfile.get(2022, 1)).to(equal(self.cofs))
+        expect(self.downloads).to(equal([(2022, 1)]))
+        expect(REEProfile.disk_cache.keys()).to(equal(['202201']))
+
+    with it('must download again an invalid month of the disk cache'):
+        REEProfile.disk_cache['202201'] = b'invalid'
+        expect(REEProfile.get(2022, 1)).to(equal(self.cofs))
+        expect(self.downloads).to(equal([(2022, 1)]))
+        REEProfile._CACHE.clear()
+        expect(REEProfile.get(2022, 1)).to(equal(self.cofs))
+        expect(self.downloads).to(equal([(2022, 1)]))
+
+
+with description('The REE profiles of a range of months'):
+    with before.each:
+        import gzip
+        import threading
+        import time
+        try:
+            from BaseHTTPServer import HTTPServer, BaseHTTPRequestHandler
+            from SocketServer import ThreadingMixIn
+        except ImportError:
+            from http.server import HTTPServer, BaseHTTPRequestHandler
+            from socketserver import ThreadingMixIn
+        from io import BytesIO
+
+        def perff(year, month):
+            lines = ['A;M;D;H;V;' + ';'.join(
+                get_tariff_coeffs_list(year, month)
+            )]
+            day = date(year, month, 1)
+            while day.month == month:
+                for hour in range(1, 25):
+                    lines.append('{0};{1};{2};{3};0;{4};0.1;0.2'.format(
+                        day.year, day.month, day.day, hour,
+                        day.day * 100 + hour
+                    ))
+                day += timedelta(days=1)
+            content = BytesIO()
+            f = gzip.GzipFile(fileobj=content, mode='wb')
+            f.write('\n'.join(lines).encode('iso8859-15'))
+            f.close()
+            return content.getvalue()
+
+        files = dict(
+            ('{0}/PERFF_{1}{2:02d}.gz'.format(REEProfile.PATH, y, m),
+             perff(y, m))
+            for y, m in [(2021, 12), (2022, 1), (2022, 2)]
+        )
+        stats = {'requests': 0, 'max_requests': 0, 'ports': set()}
+        lock = threading.Lock()
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                with lock:
+                    stats['requests'] += 1
+                    stats['max_requests'] = max(
+                        stats['max_requests'], stats['requests']
+                    )
+                    stats['ports'].add(self.client_address[1])
+                time.sleep(0.1)
+                content = files[self.path]
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/x-gzip')
+                self.send_header('Content-Length', str(len(content)))
+                self.end_headers()
+                self.wfile.write(content)
+                with lock:
+                    stats['requests'] -= 1
+
+            def log_message(self, *args):
+                pass
+
+        class Server(ThreadingMixIn, HTTPServer):
+            daemon_threads = True
+
+        self.server = Server(('127.0.0.1', 0), Handler)
+        thread = threading.Thread(target=self.server.serve_forever)
+        thread.daemon = True
+        thread.start()
+        self.stats = stats
+        self.settings = dict(
+            (k, getattr(REEProfile, k))
+            for k in ('HOST', 'connection_class', 'disk_cache', '_local')
+        )
+        REEProfile.HOST = '127.0.0.1:{0}'.format(self.server.server_address[1])
+        REEProfile.connection_class = httplib.HTTPConnection
+        REEProfile.disk_cache = None
+        REEProfile._local = threading.local()
+        REEProfile._CACHE.clear()
+
+    with after.each:
+        self.server.shutdown()
+        self.server.server_close()
+        for k, v in self.settings.items():
+            setattr(REEProfile, k, v)
+        REEProfile._CACHE.clear()
+
+    with it('must download the months at the same time'):
+        cofs = REEProfile.get_range(
+            date(2021, 12, 1), date(2022, 2, 28)
+        )
+        expect(len(cofs)).to(equal((31 + 31 + 28) * 24))
+        expect(self.stats['max_requests']).to(be_above(1))
+        start = TIMEZONE.localize(datetime(2021, 12, 1))
+        for n, c in enumerate(cofs, 1):
+            hour = TIMEZONE.normalize(start + timedelta(hours=n))
+            expect(c.hour).to(equal(hour))
+            day = hour - timedelta(hours=1)
+            expect(c.cof['2.0TD']).to(equal(day.day * 100 + day.hour + 1))
+
+    with it('must reuse the connection of the thread'):
+        REEProfile.get(2021, 12)
+        REEProfile.get(2022, 1)
+        expect(self.stats['ports']).to(have_len(1))
+
+
+with description('A profiler of synthetic coefficients'):
+    with before.all:
+        start = TIMEZONE.localize(datetime(2022, 3, 1, 1))
+        cofs = []
+        for h in range(62 * 24):
+            cofs.append(Coefficent(
+                TIMEZONE.normalize(start + timedelta(hours=h)),
+                {'2.0TD': 1e-4 * (1 + h % 24), '3.0TD': 1e-4}
+            ))
+        self.profiler = Profiler(Coefficients(cofs))
+        self.tariff = T20TD()
+        self.measures = []
+        for day, consumption in ((1, 0), (31, 1000)):
+            for code, period in sorted(self.tariff.energy_periods.items()):
+                self.measures.append(EnergyMeasure(
+                    date(2022, 3, day), period, 0,
+                    consumption=consumption + int(code[1])
+                ))
+
+    with it('must profile all the consumption'):
+        rows = list(self.profiler.profile(self.tariff, self.measures))
+        expect(rows).to(have_len(31 * 24 - 1))
+        expect(sum(row['aprox'] for _, row in rows)).to(equal(3006))
+        for _, row in rows:
+            expect(row['consumption']).to(equal(1000 + int(row['period'][1])))
+
+    with it('must classify the hours of an interval once'):
+        tariff = T20TD()
+        calls = []
+        classify_arrays = tariff.classify_arrays
+
+        def counted_classify_arrays(*args, **kwargs):
+            calls.append(args)
+            return classify_arrays(*args, **kwargs)
+
+        tariff.classify_arrays = counted_classify_arrays
+        rows = list(self.profiler.profile(tariff, self.measures))
+        expect(calls).to(have_len(1))
+        expect(sum(row['aprox'] for _, row in rows)).to(equal(3006))
+
+    with it('must profile by blocks of columns'):
+        for drag_method in ('hour', 'period'):
+            rows = list(self.profiler.profile(
+                self.tariff, self.measures, drag_method=drag_method
+            ))
+            blocks = list(self.profiler.profile_intervals(
+                self.tariff, self.measures, drag_method=drag_method
+            ))
+            expect(blocks).to(have_len(1))
+            block = blocks[0]
+            expect(block['aprox'].dtype).to(equal(np.int64))
+            expect(block['cof'].dtype).to(equal(np.float64))
+            expect(from_epoch_hours(block['hours'])).to(equal(
+                [hour for hour, _ in rows]
+            ))
+            for key in rows[0][1]:
+                expect(block[key].tolist()).to(equal(
+                    [row[key] for _, row in rows]
+                ))
+
+    with it('must profile in typed columns'):
+        rows = list(self.profiler.profile(self.tariff, self.measures))
+        columns = self.profiler.profile_columns(self.tariff, self.measures)
+        expect(from_epoch_hours(columns['hours'])).to(equal(
+            [hour for hour, _ in rows]
+        ))
+        expect(columns['aprox'].dtype).to(equal(np.int64))
+        expect(columns['drag'].dtype).to(equal(np.float64))
+        expect(columns['consumption'].dtype).to(equal(np.int64))
+        expect(columns['period'].tolist()).to(equal(
+            [row['period'] for _, row in rows]
+        ))
+        expect(columns['consumption_date'].tolist()).to(equal(
+            [row['consumption_date'] for _, row in rows]
+        ))
+        expect(columns['drag'].tolist()).to(equal(
+            [float(row['drag']) for _, row in rows]
+        ))
+
+    with it('must profile many sets of measures sharing their intervals'):
+        measures_sets = [
+            [
+                EnergyMeasure(
+                    m.date, m.period, 0, consumption=m.consumption * factor
+                )
+                for m in self.measures
+            ]
+            for factor in (1, 2, 3)
+        ]
+        measures_sets.append(self.measures[:3])
+        profiler = Profiler(self.profiler.coefficient)
+        intervals = []
+        get_interval = profiler._get_interval
+
+        def spy(tariff, start, end):
+            intervals.append((start, end))
+            return get_interval(tariff, start, end)
+
+        profiler._get_interval = spy
+        results = list(profiler.profile_batch(self.tariff, measures_sets))
+        expect(results).to(have_len(4))
+        # The last set has only the measures of the first day
+        expect(intervals).to(equal([
+            (date(2022, 3, 1), date(2022, 3, 31)),
+            (date(2022, 3, 1), date(2022, 3, 1))
+        ]))
+        for measures, result in zip(measures_sets, results):
+            expected = self.profiler.profile_columns(self.tariff, measures)
+            for key, values in expected.items():
+                expect(result[key].tolist()).to(equal(values.tolist()))
+
+    with it('must profile in a DataFrame'):
+        rows = list(self.profiler.profile(self.tariff, self.measures))
+        frame = self.profiler.profile_frame(self.tariff, self.measures)
+        expect(list(frame.columns)).to(equal(list(Profiler.keys)))
+        expect(len(frame)).to(equal(len(rows)))
+        expect(frame.index[0].to_pydatetime()).to(equal(rows[0][0]))
+        expect(frame['aprox'].tolist()).to(equal(
+            [row['aprox'] for _, row in rows]
+        ))
+
 
 with description("When profiling"):
     with before.all:
@@ -516,6 +952,27 @@ with description("When profiling"):
                 # valid profiles must pass the test
                 assert valid == expected_valid and measures3 == []
 
+            with it('must get the mask of the energy with zero sun coefficient'):
+                start = TIMEZONE.localize(datetime(2019, 1, 1, 1))
+                # From 01:00 to 23:00
+                measures = [
+                    ProfileHour(
+                        TIMEZONE.normalize(start + timedelta(hours=h)),
+                        h % 2, True, 0
+                    )
+                    for h in range(23)
+                ]
+                cofs = REProfileZone5.get_range(start, measures[-1].date)
+                expected = [
+                    m.measure != 0 and c.cof['A'] == 0
+                    for m, c in zip(measures, cofs)
+                ]
+                expect(any(expected)).to(be_true)
+                expect(all(expected)).to(be_false)
+                for m in (measures, ProfileMeasures(measures)):
+                    mask = REProfileZone5.get_exported_energy_mask(m)
+                    expect(mask.tolist()).to(equal(expected))
+
     with context('A 3.1A LB Tariff'):
         with it('must the initial_balance be different to result balance'):
             kva = 1
@@ -1164,3 +1621,162 @@ with description('When fixing'):
             # check curve with losses and curve without losses
             balance_without_losses = sum([int(x) for x in balance_without_losses.values()])
             assert balance_without_losses <= total_consumption
+
+
+with description('The measures of a profile'):
+    with before.all:
+        start = TIMEZONE.localize(datetime(2015, 3, 29, 1))
+        self.measures = [
+            ProfileHour(
+                TIMEZONE.normalize(start + timedelta(hours=h)), h, h != 2, 0.0
+            )
+            for h in range(6)
+        ]
+
+    with it('must be stored by columns'):
+        profile = Profile(
+            self.measures[0].date, self.measures[-1].date, self.measures
+        )
+        expect(profile.measures).to(be_a(ProfileMeasures))
+        expect(profile.measures.measure.dtype).to(equal(np.int64))
+        expect(list(profile.measures)).to(equal(self.measures))
+        expect(profile.measures[1]).to(equal(self.measures[1]))
+        expect(profile.measures[-1]).to(equal(self.measures[-1]))
+        expect(profile.gaps).to(equal([self.measures[2].date]))
+        expect(profile.total_consumption).to(equal(15))
+
+    with it('must keep the type of the values'):
+        measures = ProfileMeasures(self.measures)
+        measures[0] = measures[0]._replace(measure=1.5)
+        measures.insert(1, measures[1]._replace(accumulated=Decimal('0.4')))
+        expect(measures[0].measure).to(equal(1.5))
+        expect(measures[2].measure).to(be_a(int))
+        expect(measures[1].accumulated).to(equal(Decimal('0.4')))
+        expect(len(measures)).to(equal(7))
+        del measures[1]
+        expect(measures[1:]).to(equal(self.measures[1:]))
+
+    with it('must be used as a list'):
+        measures = ProfileMeasures(self.measures[1:])
+        expect(measures + self.measures[:1]).to(
+            equal(self.measures[1:] + self.measures[:1])
+        )
+        expect(self.measures[:1] + measures).to(equal(self.measures))
+        measures.append(self.measures[0])
+        expect(measures[-1]).to(equal(self.measures[0]))
+        measures.sort()
+        expect(measures).to(equal(self.measures))
+        copy = measures[:]
+        copy[1:3] = [self.measures[0]]
+        expect(copy).to(have_len(5))
+        expect(measures).to(equal(self.measures))
+        expect(measures.copy()).to(equal(self.measures))
+
+    with it('must keep the measures that can not be stored by columns'):
+        measures = self.measures[:2] + [
+            ProfileHour(datetime(2015, 3, 29, 4), 1, True, 0.0)
+        ]
+        profile = Profile(measures[0].date, measures[1].date, measures)
+        expect(profile.measures).to(be_a(list))
+        expect(profile.measures).to(equal(measures))
+        expect(lambda: ProfileMeasures(measures)).to(raise_error(TypeError))
+
+
+with description('The gaps of a profile'):
+    with before.all:
+        self.start = TIMEZONE.localize(datetime(2015, 3, 29, 1))
+        self.end = self.start + timedelta(hours=9)
+        self.measures = [
+            ProfileHour(
+                TIMEZONE.normalize(self.start + timedelta(hours=h)), h,
+                h != 5, 0.0
+            )
+            for h in (2, 3, 5, 6, 7)
+        ]
+
+    with it('must be stored as runs of consecutive hours'):
+        profile = Profile(self.start, self.end, self.measures)
+        expect(profile.gaps.runs.tolist()).to(equal([[0, 2], [4, 2], [8, 2]]))
+        expect(profile.gaps.indexes.tolist()).to(equal([0, 1, 4, 5, 8, 9]))
+
+    with it('must return the gaps as hours from the start'):
+        profile = Profile(self.start, self.end, self.measures)
+        gaps = [self.start + timedelta(hours=h) for h in (0, 1, 4, 5, 8, 9)]
+        expect(profile.gaps).to(equal(gaps))
+        expect(len(profile.gaps)).to(equal(6))
+        expect(profile.gaps[2]).to(equal(gaps[2]))
+        expect(profile.gaps[-1]).to(equal(gaps[-1]))
+        expect(profile.gaps[1:3]).to(equal(gaps[1:3]))
+        expect(profile.gaps).to(contain(gaps[3]))
+        expect(profile.gaps).not_to(contain(self.start + timedelta(hours=2)))
+
+    with it('must be added to a list as a list'):
+        profile = Profile(self.start, self.end, self.measures)
+        gaps = [self.start + timedelta(hours=h) for h in (0, 1, 4, 5, 8, 9)]
+        extra = [self.end + timedelta(hours=1)]
+        expect(profile.gaps.to_list()).to(equal(gaps))
+        expect(profile.gaps + extra).to(equal(gaps + extra))
+        expect(extra + profile.gaps).to(equal(extra + gaps))
+        expect(profile.gaps + profile.gaps).to(equal(gaps + gaps))
+
+    with it('must not have gaps for a complete profile'):
+        measures = [m._replace(valid=True) for m in self.measures]
+        profile = Profile(measures[0].date, measures[1].date, measures)
+        expect(profile.gaps).to(be_empty)
+        expect(profile.gaps.indexes).to(have_len(0))
+
+
+with description('An estimation with flat coefficients'):
+    with before.all:
+        self.start = TIMEZONE.localize(datetime(2015, 3, 2, 1))
+        self.end = TIMEZONE.localize(datetime(2015, 3, 3, 0))
+        self.measures = [
+            ProfileHour(
+                TIMEZONE.normalize(self.start + timedelta(hours=h)), 1, True,
+                0.0
+            )
+            for h in range(24) if h % 3
+        ]
+
+    with it('must fill the gaps in order dragging the energy'):
+        tariff = T20A()
+        profile = Profile(self.start, self.end, self.measures)
+        profile.profile_class = REProfileFlat
+        estimated = profile.estimate(tariff, {'P1': 26})
+        expect(estimated.gaps).to(be_empty)
+        expect(estimated.n_hours_measures).to(equal(24))
+        dates = [m.date for m in estimated.measures]
+        expect(dates).to(equal(sorted(dates)))
+        expect(estimated.total_consumption).to(equal(26))
+        dragger = Dragger()
+        expected = [dragger.drag(10 / 8.0) for gap in profile.gaps]
+        gaps = [m.measure for m in estimated.measures if m.date in profile.gaps]
+        expect(gaps).to(equal(expected))
+
+    with it('must estimate with the coefficients of a custom class'):
+        start = self.start
+        end = self.end
+
+        class HourlyProfile(object):
+            """Coefficients of every hour, up to the end of the profile."""
+
+            @classmethod
+            def get_range(cls, first, last):
+                expect(last).to(equal(end))
+                return [
+                    Coefficent(
+                        TIMEZONE.normalize(start + timedelta(hours=h)),
+                        {'A': 1.0}
+                    )
+                    for h in range(24)
+                ]
+
+        tariff = T20A()
+        tariff.cof = 'A'
+        profile = Profile(self.start, self.end, self.measures)
+        profile.profile_class = HourlyProfile
+        estimated = profile.estimate(tariff, {'P1': 26})
+        expect(estimated.gaps).to(be_empty)
+        expect(estimated.total_consumption).to(equal(26))
+        fixed = profile.fixit(tariff, {'P1': 30})
+        expect(fixed.total_consumption).to(equal(30))